@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+''' tslite benchmark suite
+Times the hot paths of tslite on synthetic regular and irregular series and
+reports throughput (points per second) and peak memory as JSON.
+
+Usage:
+  python bench.py                              # 10^3 .. 10^5 points
+  python bench.py --sizes 1000 10000000        # up to 10^7 points
+  python bench.py --save bench_baseline.json   # record a baseline
+  python bench.py --baseline bench_baseline.json --tolerance 0.25
+
+When a baseline is given, benchmarks whose throughput dropped by more than
+the tolerance are flagged and the script exits with status 1.
+'''
+import argparse, datetime, json, os, random, sys, tempfile, time, tracemalloc
+import tslite
+
+START = datetime.datetime(2000, 1, 1)
+
+
+def regular(n, step=datetime.timedelta(minutes=15)):
+  '''synthetic regular series of n points'''
+  ts = tslite.timeseries()
+  ts.data = [[START + step * i, 100.0 + 10.0 * ((i % 96) / 96.0)]
+             for i in range(n)]
+  return ts
+
+
+def irregular(n, seed=42):
+  '''synthetic irregular series of n points, 1 to 30 minutes apart'''
+  rand = random.Random(seed)
+  ts = tslite.timeseries()
+  t = START
+  for i in range(n):
+    t += datetime.timedelta(minutes=rand.randint(1, 30))
+    ts.data.append([t, rand.uniform(0.0, 1000.0)])
+  return ts
+
+
+def rating():
+  '''synthetic stage/flow rating table'''
+  r = tslite.rdb(None)
+  r.data = [["%.2f" % (x / 10.0), "0.00", "%.2f" % ((x / 10.0)**1.5 * 100), ""]
+            for x in range(0, 2001)]
+  return r
+
+
+def measure(func, repeat):
+  '''returns (best of repeat runs in seconds, peak bytes allocated)
+     peak memory comes from one extra run under tracemalloc so that its
+     overhead does not skew the timings
+  '''
+  best = None
+  for i in range(repeat):
+    t0 = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - t0
+    best = elapsed if best == None else min(best, elapsed)
+  tracemalloc.start()
+  func()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return best, peak
+
+
+def benchmarks(kind, ts, tmp):
+  '''returns a list of (name, function) pairs to time on series ts'''
+  n = len(ts)
+  half = tslite.timeseries(ts.data[0::2])
+  other = tslite.timeseries(ts.data[1::2])
+  shifted = ts.timeshift(ts.TD("15m"))
+  buf = ts.toBinary()
+  buf3 = ts.toBinaryV3()
+  tsv = os.path.join(tmp, "%s_%d.tsv" % (kind, n))
+  ts.saveTSV(tsv)
+  db = os.path.join(tmp, "%s_%d.db" % (kind, n))
+  conn = ts.SQLITE3connect(db)
+  ts.saveSQLITE3(conn, "bench", replace_table=True)
+  stage = ts.div(100.0)
+  r = rating()
+  keys = ts.timestamps()
+
+  def insert():
+    out = tslite.timeseries()
+    for line in ts.data:
+      out.insert(line[0], line[1])
+
+  def insertReversed():
+    out = tslite.timeseries()
+    out.insertMany(reversed(ts.data))
+
+  return [
+      ("insert", insert),
+      ("insertMany reversed", insertReversed),
+      ("merge", lambda: half.merge(other)),
+      ("findIndex sequential", lambda: [ts.findIndex(t) for t in keys]),
+      ("findIndices", lambda: ts.findIndices(keys)),
+      ("toBinary", lambda: ts.toBinary()),
+      ("fromBinary", lambda: tslite.timeseries().fromBinary(buf)),
+      ("toBinaryV3", lambda: ts.toBinaryV3()),
+      ("fromBinaryV3", lambda: tslite.timeseries().fromBinaryV3(buf3)),
+      ("fromBinary columnar",
+       lambda: tslite.timeseries(columnar=True).fromBinary(buf)),
+      ("loadTSV", lambda: tslite.timeseries().loadTSV(tsv)),
+      ("saveSQLITE3", lambda: ts.saveSQLITE3(conn, "benchsave", True)),
+      ("loadSQLITE3", lambda: ts.loadSQLITE3(conn, "bench")),
+      ("average 1d", lambda: ts.average("1d")),
+      ("movingaverage 1d", lambda: ts.movingaverage("1d")),
+      ("snap 1h", lambda: ts.snap("1h", "30m")),
+      ("filldown 1h", lambda: ts.filldown("1h")),
+      ("operation add", lambda: ts.add(shifted)),
+      ("operation lambda", lambda: ts.operation(lambda x, y: x - y, shifted)),
+      ("rdb.rateTS", lambda: r.rateTS(stage)),
+  ]
+
+
+def run(sizes, kinds, repeat):
+  results = {}
+  with tempfile.TemporaryDirectory(prefix="tslite_bench_") as tmp:
+    for kind in kinds:
+      for n in sizes:
+        ts = regular(n) if kind == "regular" else irregular(n)
+        for name, func in benchmarks(kind, ts, tmp):
+          best, peak = measure(func, repeat)
+          key = "%s/%s/%d" % (name, kind, n)
+          results[key] = {
+              "seconds": best,
+              "points_per_second": n / best if best > 0 else None,
+              "peak_bytes": peak
+          }
+          sys.stderr.write("%-40s %10.4fs %14.0f pts/s %12d bytes\n" %
+                           (key, best, n / best if best > 0 else 0, peak))
+  return results
+
+
+def compare(results, baseline, tolerance):
+  '''returns a list of benchmarks slower than baseline by more than tolerance'''
+  regressions = []
+  for key, res in results.items():
+    base = baseline.get(key)
+    if not base or not base.get("points_per_second") or not res["points_per_second"]:
+      continue
+    ratio = res["points_per_second"] / base["points_per_second"]
+    if ratio < 1.0 - tolerance:
+      regressions.append({"benchmark": key, "ratio": ratio})
+  return regressions
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="tslite benchmark suite")
+  parser.add_argument("--sizes", type=int, nargs="+",
+                      default=[1000, 10000, 100000])
+  parser.add_argument("--kinds", nargs="+", default=["regular", "irregular"],
+                      choices=["regular", "irregular"])
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--output", help="write the JSON report to this file")
+  parser.add_argument("--save", help="save the results as a baseline file")
+  parser.add_argument("--baseline", help="compare against a baseline file")
+  parser.add_argument("--tolerance", type=float, default=0.25,
+                      help="allowed fractional throughput drop")
+  args = parser.parse_args(argv)
+
+  results = run(args.sizes, args.kinds, args.repeat)
+  report = {"python": sys.version.split()[0], "results": results}
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f).get("results", {})
+    report["regressions"] = compare(results, baseline, args.tolerance)
+  text = json.dumps(report, indent=2, sort_keys=True)
+  if args.output:
+    with open(args.output, "w") as f:
+      f.write(text)
+  else:
+    print(text)
+  if args.save:
+    with open(args.save, "w") as f:
+      f.write(text)
+  if report.get("regressions"):
+    for r in report["regressions"]:
+      sys.stderr.write("REGRESSION %s: %.0f%% of baseline\n" %
+                       (r["benchmark"], 100 * r["ratio"]))
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import datetime, sys, os, io
+import datetime, sys, os, io, subprocess
 import tslite, json, zlib, lzma
 import dateutil.parser
 
@@ -24,6 +24,16 @@ class bcolors:
 
 #Begin tslite tests
 print("Testing tslite")
+#Import time budget, optional dependencies are imported on first use
+#----------------------------------------------------------------
+code = "import sys, time; t = time.perf_counter(); import tslite; print(time.perf_counter() - t, *[m for m in ('numpy', 'dateutil', 'sqlite3', 'json') if m in sys.modules])"
+out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.split()
+result("import time budget (%s s)" % out[0][:5], float(out[0]) < 0.15 and len(out) == 1)
+#a script that only reads a binary file and does arithmetic stays off numpy
+code = "import sys, time; t0 = time.perf_counter(); import tslite; t = tslite.timeseries().loadBinary('test/test.dat'); t.add(t); t.add(1.0); t == t; t.findIndices(t.timestamps()[:10]); print(time.perf_counter() - t0, *[m for m in ('numpy', 'dateutil', 'sqlite3', 'json') if m in sys.modules])"
+out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.split()
+result("loadBinary and add time budget (%s s)" % out[0][:5], len(out) == 1)
+
 #Binary IO
 #----------------------------------------------------------------
 t = tslite.timeseries().loadBinaryV1("test/testv1.dat")
@@ -35,6 +45,10 @@ result("Save Binary Data", t.status == "OK")
 probe = tslite.timeseries().loadBinary("test/test.dat")
 result("Load Binary Data", t == probe)
 
+a, b = t.data[1000][0], t.data[2000][0]
+probe = tslite.timeseries().loadBinary("test/test.dat", a, b)
+result("Load Binary range (mmap)", probe == t.subSlice(a, b) and len(probe) == 1001)
+
 print(" zlib compressing timeseries of length %d..." % (len(t)))
 b = t.toBinary()
 z = zlib.compress(memoryview(b), 9)
@@ -62,6 +76,72 @@ with lzma.open("test/test.xz") as f:
   probe = tslite.timeseries().fromBinary(f.read())
 result("lzma Binary compression on disk", t == probe)
 
+#v3 block compressed binary format
+t.saveBinaryV3("test/test.v3", block_size=512)
+probe = tslite.timeseries().loadBinaryV3("test/test.v3")
+print(" v3 binary is %.1f%% of v2" % (100.0 * os.path.getsize("test/test.v3") / os.path.getsize("test/test.dat")))
+result("v3 Binary IO", t == probe and probe.data == t.data)
+a, b = t.data[700][0], t.data[1800][0]
+probe = tslite.timeseries().loadBinaryV3("test/test.v3", a, b)
+result("v3 Binary range", probe.data == t.subSlice(a, b).data and tslite.timeseries().fromBinaryV3(t.toBinaryV3(), a, b) == probe)
+result("v3 reads v2", tslite.timeseries().loadBinaryV3("test/test.dat", a, b) == probe)
+result("v3 buffer reads v2", tslite.timeseries().fromBinaryV3(t.toBinary(), a, b) == probe and tslite.timeseries().fromBinaryV3(t.toBinary()) == t)
+with open("test/test.v3", "wb") as f:
+  f.write(t.toBinaryV3()[:-4])
+probe = tslite.timeseries().loadBinaryV3("test/test.v3")
+result("v3 bad trailer", len(probe) == 0 and "bad trailer" in probe.status and "bad trailer" in tslite.timeseries().fromBinaryV3(t.toBinaryV3()[:-4]).status)
+os.remove("test/test.v3")
+
+#Columnar storage
+#----------------------------------------------------------------
+c = t.toColumnar()
+result("Columnar storage", c.isColumnar() and c == t and c.data[5] == t.data[5])
+a, b = t.data[100][0], t.data[200][0]
+result("Columnar subSlice", c.subSlice(a, b) == t.subSlice(a, b))
+result("Columnar findIndex", c.findIndex(b) == t.findIndex(b) == 200)
+keys = [t.data[i][0] for i in range(0, len(t), 7)] + [t.data[-1][0] + t.TD("1h")]
+probe = list(range(0, len(t), 7)) + [-1]
+result("findIndices", t.findIndices(keys) == probe and c.findIndices(keys) == probe and t.findIndices(keys[::-1]) == probe[::-1])
+result("findIndex cursor", [t.findIndex(k) for k in keys] == probe and t.findClosestIndex(a + t.TD("1s")) == 101 and c.findClosestIndex(a + t.TD("1s")) == 101)
+probe = tslite.timeseries(columnar=True)
+for line in reversed(t.data[:300]):
+  probe.insert(line[0], line[1])
+result("Columnar insert", probe.data == t.data[:300])
+probe = tslite.timeseries(columnar=True).fromBinary(t.toBinary())
+result("Columnar Binary IO", probe == t and probe.toBinary() == t.toBinary())
+rows = [[datetime.datetime(2014, 3, 9, h, 30), float(h)] for h in (1, 2, 3)] + [[datetime.datetime(2014, 11, 2, 1, 30), 4.0]]
+probe = tslite.timeseries(rows, columnar=True)
+result("Columnar DST round trip", probe.data == rows and probe.timestamps() == [row[0] for row in rows] and tslite.timeseries().fromBinary(probe.toBinary()) == tslite.timeseries().fromBinary(tslite.timeseries(rows).toBinary()))
+
+#Change sets
+#----------------------------------------------------------------
+t1 = t.subSlice(t.data[10][0], t.data[-1][0]).add(0.0)
+t1.data[5][1] += 1.0
+t1.insert(t.data[-1][0] + t.TD("1h"), 1.0)
+probe = t.changes(t1)
+result("changes", probe["removed"].data == t.data[:10] and probe["added"].data == t1.data[-1:] and probe["changed"].data == [t1.data[5]])
+result("changes columnar", all(c.changes(t1.toColumnar())[k] == v for k, v in probe.items()))
+result("diff", t.diff(t1).data == [t1.data[5], t1.data[-1]])
+result("equals", t.equals(c) and t.equals(t.add(1e-9)) and not t.equals(t.timeshift(t.TD("1s"))) and t == t.timeshift(t.TD("1s")))
+
+#Arithmetic
+#----------------------------------------------------------------
+t1 = t.subSlice(a, b).timeshift(t.TD("1d"))
+probe = t.operation(lambda x, y: x + y, t1)
+result("Merge-join add", len(probe) > 0 and t.add(t1) == probe)
+result("Columnar add", c.add(c.subSlice(a, b)) == t.add(t.subSlice(a, b)))
+result("Scalar div", t.div(2.0) == t.operation(lambda x, y: x / y, 2.0))
+
+#Bulk insert and merge
+#----------------------------------------------------------------
+t1 = tslite.timeseries(t.data[0::2])
+t2 = tslite.timeseries(t.data[1::2])
+result("Linear merge", t1.merge(t2) == t and t2.merge(t1) == t)
+result("Columnar merge", t1.toColumnar().merge(t2.toColumnar()) == t)
+probe = tslite.timeseries()
+probe.insertMany([[b, 1.0], [a, 2.0], [b, 3.0]])
+result("insertMany last write wins", probe.values() == [2.0, 3.0])
+
 #SQLITE3 IO
 #----------------------------------------------------------------
 conn = tslite.timeseries().SQLITE3connect("test/test.db")
@@ -80,6 +160,37 @@ result("Save to SQLITE3 database", t.status == "OK")
 probe = tslite.timeseries().loadSQLITE3(conn, "saveSQLITE3")
 result("Load from SQLITE3 database", t == probe)
 
+a, b = t.data[1000][0], t.data[2000][0]
+probe = tslite.timeseries().loadSQLITE3(conn, "saveSQLITE3", a, b)
+result("Load range from SQLITE3 database", probe == t.subSlice(a, b) and len(probe) == 1001)
+probe = tslite.timeseries(columnar=True).loadSQLITE3(conn, "saveSQLITE3")
+result("Load columnar from SQLITE3 database", probe.isColumnar() and t == probe)
+t1 = tslite.timeseries(columnar=True)
+for i, v in enumerate([1.0, None, 3.0]):
+  t1.data.append([datetime.datetime(2020, 1, 1, i), v])
+t1.saveSQLITE3(conn, "nulls", replace_table=True)
+probe = tslite.timeseries(columnar=True).loadSQLITE3(conn, "nulls")
+result("Columnar SQLITE3 NULL values", probe.status == "OK" and len(probe.data.vals) == len(probe.data.times) == 3 and probe.values()[1] != probe.values()[1])
+probe = tslite.timeseries()
+probe.saveSQLITE3(None, "nowhere")
+result("saveSQLITE3 without a connection", "Could not store NOWHERE" in probe.status)
+probe = tslite.timeseries(t.data[:10])
+probe.data[5] = [probe.data[5][0], 1j]
+probe.saveSQLITE3(conn, "saveSQLITE3", replace_table=True)
+result("saveSQLITE3 rolls back a failed replace", "Could not store" in probe.status and tslite.timeseries().loadSQLITE3(conn, "saveSQLITE3") == t)
+
+#SQLITE3 catalog
+#----------------------------------------------------------------
+cat = tslite.catalog(tslite.timeseries().SQLITE3connect(":memory:"))
+t1 = t.subSlice(a, b)
+cat.save({"gauge1": t, "gauge2": t1})
+probe = cat.load(["GAUGE1", "GAUGE2", "missing"])
+result("Catalog save and load", probe["GAUGE1"] == t and probe["GAUGE2"] == t1 and len(probe) == 2)
+probe = cat.load(["gauge1"], a, b, columnar=True)
+result("Catalog range load", probe["GAUGE1"] == t1)
+t.saveSQLITE3(cat.conn, "legacy")
+result("Catalog migration", cat.migrate() == ["LEGACY"] and cat.load(["legacy"])["LEGACY"] == t)
+
 #Snap
 #----------------------------------------------------------------
 t2 = t.snap("1d", "6h")
@@ -93,6 +204,27 @@ t2 = t.snap(t.TD("1d"),t.TD("6h"),starttime=datetime.datetime(year=2014, month=1
 probe = tslite.timeseries().loadSQLITE3(conn, "hardsnap")
 result("hardsnap", probe == t2)
 
+#Resampling
+#----------------------------------------------------------------
+t1 = t.resample("1d", "max", align="day", label="start")
+result("resample aligned to midnight", t1.data[0][0] == datetime.datetime(2014, 1, 5) and t1.data[1][1] == t.subSlice(datetime.datetime(2014, 1, 6), datetime.datetime(2014, 1, 6, 23, 59, 59)).globalMax()[1])
+t1 = t.resample("month", "count")
+result("resample calendar months", t1.values() == [sum(1 for x in t.timestamps() if x.month == 1), sum(1 for x in t.timestamps() if x.month == 2)] and t1.data[0][0] == datetime.datetime(2014, 2, 1))
+
+#Lazy pipeline
+#----------------------------------------------------------------
+t0, t1 = datetime.datetime(2014, 1, 10), datetime.datetime(2014, 1, 20)
+lz = t.lazy().subSlice(t0, t1).cullBelow(800).timeshift("1h").mul(2).round(1).average("1d").collect()
+t3 = t.subSlice(t0, t1).cullBelow(800).timeshift(t.TD("1h")).mul(2).round(1).average("1d")
+result("lazy pipeline", len(lz) > 0 and lz == t3 and lz.timestamps() == t3.timestamps())
+bad = []
+for args in (("1d", "median"), (5, "mean")):
+  try:
+    t.lazy().resample(*args)
+  except ValueError:
+    bad.append(args)
+result("lazy resample validates", len(bad) == 2 and len(t.lazy().resample("month", "count").collect()) == 2)
+
 #Variance
 #----------------------------------------------------------------
 result(
@@ -148,18 +280,20 @@ t2 = t.cut(t1)
 #print("t", t, "t2", t1, "result", t2)
 #result("cut", t3.__eq__(probe, precision=2))
 
-#Moving Standard Deviation  BROKEN!
+#Moving Standard Deviation
 #----------------------------------------------------------------
-#t = tslite.timeseries().loadSQLITE3 (conn, "test6hr")
-#t1 = t.movingstddev("1d")
-#probe = tslite.timeseries().loadTSV("test/movingSTDDEV.tsv")
-#result("Moving Standard Deviation", t1.__eq__(probe, precision=2))
+t = tslite.timeseries().loadBinary("test/test.dat")
+t1 = t.movingstddev("1d")
+probe = tslite.timeseries().loadTSV("test/movingSTDDEV.tsv")
+result("Moving Standard Deviation", t1.__eq__(probe, precision=2))
 
 #toJSON
 #----------------------------------------------------------------
 t = tslite.timeseries().fromJSON(open("test/test.json", "r").read())
 t1 = tslite.timeseries().fromJSON(t.toJSON())
 result("fromJSON and toJSON", t == t1)
+probe = tslite.timeseries().fromTSV(str(t.toColumnar()).split("\n"))
+result("toString and fromTSV", probe == t.round(3))
 #print (t.status,"test",t.toJSON(),"probe",t1)
 
 #Round
@@ -194,3 +328,185 @@ result("toPlot", t == probe)
 t1 = tslite.timeseries().loadTSV("test/inflow.tsv")
 probe = tslite.timeseries().loadTSV("test/runningTotal.tsv")
 result("runningTotal", t1.runningTotal() == probe)
+
+#TSV parsing
+#----------------------------------------------------------------
+lines = str(t1).split("\n") + ["bogus\t1.0", "# comment", "01/02/2019 13:00\t5"]
+probe = tslite.timeseries().fromTSV(lines)
+result("TSV format detection", probe.data[1:] == t1.data and probe.data[0] == [datetime.datetime(2019, 1, 2, 13), 5.0])
+result("TSV parse errors", probe.parseErrors[0][0] == len(t1) + 2 and probe.status != "OK")
+
+#Water year climatology
+#----------------------------------------------------------------
+t1 = tslite.timeseries([[datetime.datetime(2000, 10, 1) + datetime.timedelta(days=i), float(i % 7)] for i in range(3 * 365)])
+keys = t1.waterYearKeys()
+probe = t1.climatology(("mean", "min", "max", "median"), percentiles=(25, ), keys=keys)
+oct1 = sorted(float(i % 7) for i in (0, 365, 730))
+result("water year climatology", probe["mean"].data[0] == [datetime.datetime(2002, 10, 1), sum(oct1) / 3] and probe["median"].data[0][1] == oct1[1] and probe["p25"].data[0][1] == (oct1[0] + oct1[1]) / 2 and probe["max"].data[0][1] == oct1[2])
+result("getWY with keys", t1.getWY(2002, keys) == t1.getWY(2002) and t1.averageWY() == probe["mean"])
+
+#Rating tables
+#----------------------------------------------------------------
+r = tslite.rdb(None)
+r.data = [["%.2f" % x, "0.00", "%.2f" % (x**1.5 * 100), ""] for x in range(1, 11)]
+t1 = tslite.timeseries([[datetime.datetime(2020, 1, 1, i), 1.0 + i / 4.0] for i in range(24)])
+probe = r.rateTS(t1)
+result("rdb rate", r.rate(2.5) == (282.84 + 519.62) / 2 and probe.data[2][1] == r.rate(1.5) and r.reverseRateTS(probe) == t1)
+result("rdb log-log rate", abs(r.rate(4.0, log=True) - 800.0) < 1e-9 and abs(r.reverseRate(r.rate(6.5, log=True), log=True) - 6.5) < 1e-9)
+
+grid = tslite.tablegrid(None)
+grid.data = [[0.0, 10.0, 20.0, 30.0], [1.0, 1.0, 2.0, 3.0], [2.0, 2.0, 4.0, 6.0], [3.0, 3.0, 6.0, 9.0]]
+probe = grid.rateTS(t1, t1.timeshift(t1.TD("1h")).div(4.0))
+result("tablegrid lookup", grid.tableLookup(grid.data, 15.0, 1.5) == 2.25 and grid.tableLookup(grid.data, 40.0, 3.0) == 12.0)
+result("tablegrid rateTS", len(probe) == len(t1) - 1 and probe.data[0] == [t1.data[1][0], grid.tableLookup(grid.data, t1.data[1][1], t1.data[0][1] / 4.0)])
+
+#Batch executor
+#----------------------------------------------------------------
+spec = [("snap", ("1d", "6h")), ("filldown", ("1d",)), ("bogus",)]
+job = tslite.batch(spec[:2], workers=0)
+probe = job.run(["test6hr", "testdaily", "missing"], db="test/test.db")
+t1 = tslite.timeseries().loadSQLITE3(conn, "testdaily")
+result("batch inline", probe["testdaily"] == t1.snap("1d", "6h").filldown("1d") and "missing" in job.errors)
+
+#Asyncio loaders
+#----------------------------------------------------------------
+import asyncio
+
+async def aload():
+  loader = tslite.asyncloader(workers=4)
+  try:
+    probe = await loader.loadMany(["test6hr", "testdaily", "missing"], db="test/test.db")
+    files = await asyncio.gather(tslite.timeseries().aloadTSV("test/inflow.tsv"), tslite.timeseries().aloadBinary("test/test.dat"))
+    return probe, loader.errors, files
+  finally:
+    loader.close()
+
+probe, errors, files = asyncio.run(aload())
+result("asyncio loadMany", probe["testdaily"] == t1 and list(errors) == ["missing"] and len(probe) == 2)
+result("asyncio loaders", files[0] == tslite.timeseries().loadTSV("test/inflow.tsv") and files[1] == tslite.timeseries().loadBinary("test/test.dat"))
+loader = tslite.asyncloader()
+load = tslite.timeseries.loadSQLITE3
+def closingLoad(self, *args):
+  loader.close()
+  return load(self, *args)
+tslite.timeseries.loadSQLITE3 = closingLoad
+try:
+  probe = loader._readSQLITE3("test/test.db", "testdaily", None, None, False)
+finally:
+  tslite.timeseries.loadSQLITE3 = load
+result("asyncio close during read", probe == t1 and loader._pools == {})
+#Streaming ingest
+#----------------------------------------------------------------
+t = tslite.timeseries().loadBinary("test/test.dat")
+feed = tslite.stream().addRunningTotal().addResample("hourly", "1h", "mean").addSummary()
+for i in range(0, len(t), 5000):
+  feed.push(t.data[i:i + 5000])
+feed.push(t.data[:10])
+summary = feed.result("summary")
+result("stream push", feed.ts == t and feed.dropped == 10 and feed.result("runningTotal") == t.runningTotal() and feed.result("hourly") == t.resample("1h", "mean"))
+feed = tslite.stream()
+x = t.data[-1][0]
+result("stream batch duplicates", feed.push([[x, 1.0], [x, 2.0], [x, 3.0]]) == 1 and feed.dropped == 2 and feed.ts.data[-1][1] == 3.0)
+result("stream summary", summary["count"] == len(t) and summary["max"][1] == max(t.values()) and abs(summary["mean"] - sum(t.values()) / len(t)) < 1e-9)
+lines = open("test/inflow.tsv").read()
+feed = tslite.stream().addResample("daily", "1d", "sum")
+with open("test/tail.tsv", "w") as f:
+  for i in range(0, len(lines), 100):
+    f.write(lines[i:i + 100])
+    f.flush()
+    feed.tailTSV("test/tail.tsv")
+os.remove("test/tail.tsv")
+t1 = tslite.timeseries().loadTSV("test/inflow.tsv")
+result("stream tailTSV", feed.ts == t1 and feed.result("daily") == t1.accumulate("1d"))
+
+#Result cache
+#----------------------------------------------------------------
+t = tslite.timeseries().loadBinary("test/test.dat")
+cache = tslite.enableResultCache(max_entries=3)
+probe = t.average("1d")
+probe.data[0][1] = -1.0
+t1 = t.average("1d")
+m = t.globalMax()
+result("result cache hits", cache.hits == 1 and t1 == t.average("1d") and t1.data[0][1] != -1.0 and t.globalMax() == m)
+version = t.version
+t.insert(t.data[10][0] + t.TD("1s"), 1e6)
+result("result cache invalidation", t.version == version + 1 and t.globalMax()[1] == 1e6 and t.average("1d") != t1)
+t.data.pop(11)
+t.invalidate()
+result("result cache eviction", t.globalMax() == m and len(cache.entries) == 2 and cache.evictions > 0 and cache.stats()["misses"] == cache.misses)
+tslite.disableResultCache()
+
+#numpy and pure Python paths agree
+#----------------------------------------------------------------
+def bothPaths(f):
+  '''returns f() computed without numpy, then with numpy'''
+  tslite._NUMPY_AVAILABLE = False
+  try:
+    pure = f()
+  finally:
+    tslite._NUMPY_AVAILABLE = True
+  return pure, f()
+
+def raises(f):
+  try:
+    f()
+  except ZeroDivisionError:
+    return True
+  return False
+
+t = tslite.timeseries().loadBinary("test/test.dat")
+c = t.toColumnar()
+shifted = t.timeshift(t.TD("15m")).subSlice(t.data[0][0], t.data[3000][0])
+import numpy
+result("numpy used once imported", tslite._numpy() is numpy)
+probe = [bothPaths(lambda: t.resample(iv, how)) for iv, how in (("1h", "mean"), ("1d", "max"), ("6h", "min"), ("1d", "sum"))]
+result("numpy resample", all(a.equals(b, 1e-9) for a, b in probe))
+probe = bothPaths(lambda: t.add(shifted)) + bothPaths(lambda: c.subtract(shifted.toColumnar())) + bothPaths(lambda: c.mul(2.5)) + bothPaths(lambda: c.div(c))
+result("numpy operation", all(probe[i].equals(probe[i + 1], 1e-9) and len(probe[i]) > 0 for i in range(0, 8, 2)) and probe[2].isColumnar())
+probe = tslite.timeseries(t.data[:5])
+probe.data[2] = [probe.data[2][0], None]
+missing = [bothPaths(lambda: probe.add(1.0)), bothPaths(lambda: probe.mul(probe)), bothPaths(lambda: c.subSlice(t.data[0][0], t.data[4][0]).subtract(probe))]
+result("numpy operation skips None", all(a == b and len(a) == 4 and a.status == "OK" for a, b in missing) and probe.status == c.status == "OK")
+result("numpy division by zero", all(bothPaths(lambda: c.div(0.0).status == "OK" and "division" in c.getStatus())))
+probe = bothPaths(lambda: t.changes(shifted.add(1.0))) + bothPaths(lambda: c.changes(shifted.add(1.0).toColumnar()))
+result("numpy changes", all(probe[0][k].equals(p[k]) for p in probe[1:] for k in probe[0]))
+keys = t.timestamps()[::3] + shifted.timestamps()[::5]
+probe = bothPaths(lambda: c.findIndices(sorted(keys)))
+result("numpy findIndices", probe[0] == probe[1] == t.findIndices(sorted(keys)))
+t1 = tslite.timeseries([[datetime.datetime(2000, 10, 1) + datetime.timedelta(hours=6 * i), float(i % 13)] for i in range(3 * 1460)])
+probe = bothPaths(lambda: t1.climatology(("mean", "min", "max", "median", "count"), percentiles=(10, 90)))
+result("numpy climatology", all(probe[0][k].equals(probe[1][k], 1e-9) for k in probe[0]))
+r = tslite.rdb(None)
+r.data = [["%.2f" % x, "0.00", "%.2f" % (x**1.5 * 100), ""] for x in range(1, 11)]
+stage = t.div(100.0).add(-5.0)
+probe = bothPaths(lambda: r.rateTS(stage)) + bothPaths(lambda: r.reverseRateTS(r.rateTS(stage), log=True))
+result("numpy rdb rateTS", probe[0].equals(probe[1], 1e-9) and probe[2].equals(probe[3], 1e-9) and len(probe[2]) > 0)
+r.data.append(r.data[-1])
+result("rdb division by zero", all(bothPaths(lambda: raises(lambda: r.rateTS(tslite.timeseries([[t.data[0][0], 12.0]]))))))
+grid = tslite.tablegrid(None)
+grid.data = [[0.0] + [2.0 * i for i in range(20)]] + [[3.0 * j] + [float((i * j) % 17) for i in range(20)] for j in range(20)]
+probe = bothPaths(lambda: grid.rateTS(t.div(25.0), shifted.div(20.0)))
+result("numpy tablegrid rateTS", probe[0].equals(probe[1], 1e-9) and len(probe[0]) > 0)
+
+if __name__ == "__main__":
+  job = tslite.batch(spec, workers=2)
+  probe = job.run({"a": t1, "b": t1})
+  result("batch process pool errors", probe == {} and len(job.errors) == 2)
+  job = tslite.batch(spec[:2], workers=2)
+  probe = job.run(["test/test.dat", "test/inflow.tsv"])
+  result("batch process pool", probe["test/inflow.tsv"] == tslite.timeseries().loadTSV("test/inflow.tsv").snap("1d", "6h").filldown("1d"))
+
+#Instrumentation
+#----------------------------------------------------------------
+tslite.resetInstrumentation()
+events = []
+tslite.enableInstrumentation(hook=lambda name, event: events.append(name))
+t1.average("1d")
+t1.operation(lambda x, y: x / y, 0.0)
+t1.operation(lambda x, y: x / y, 0.0)
+t1.accumulate("1d", "not a date")
+status = t1.getStatus()
+tslite.disableInstrumentation()
+t1.average("1d")
+m = tslite.instrumentationSnapshot()
+result("instrumentation", m["timeseries.average"]["calls"] == 1 and m["timeseries.average"]["input_points"] == len(t1) and m["timeseries.operation"]["swallowed"] == 2 and m["timeseries.resample"]["swallowed"] == 1 and m["timeseries.accumulate"]["swallowed"] == 0 and "unsupported operand" in status and type(status) is str and type(t1.status) is str and "timeseries.resample" in events)
@@ -5,32 +5,71 @@ v2.0.0
 Author: Gunnar Leffler
 '''
 
-import sys, os, time, datetime, struct, math, re, json
-import dateutil.parser as dateparser
-from functools import wraps
-
-##Load optional libraries
-try:
-  import numpy as np
-  from math import factorial  ## Factorial not in Jython 2.5.x math module
-except:
-  _NUMPY_AVAILABLE = False
-else:
-  _NUMPY_AVAILABLE = True
+import sys, os, time, datetime, struct, math, operator, itertools
+from functools import wraps, reduce
+from itertools import dropwhile, takewhile, groupby
+from array import array
+from bisect import bisect_left, bisect_right
+from math import factorial
+
+##Optional libraries and dateutil are imported on first use to keep
+##"import tslite" fast, see _numpy, _sqlite3 and _dateparser.  numpy is
+##only imported by methods that require it, other paths use it if loaded.
+##The flags turn False once an import has failed.
+_NUMPY_AVAILABLE = True
+_SQLITE3_AVAILABLE = True
+np = None
+sqlite3 = None
+dateparser = None
+
+
+def _numpy(load=False):
+  '''returns the numpy module, or None if it is not available
+     load: import numpy if needed, only methods that require it do this.
+           Otherwise numpy is only used once something else imported it,
+           so reading a file and doing arithmetic never pays its import time.
+  '''
+  global np, _NUMPY_AVAILABLE
+  if np == None and _NUMPY_AVAILABLE:
+    if not load:
+      np = sys.modules.get("numpy")
+    else:
+      try:
+        import numpy
+      except ImportError:
+        _NUMPY_AVAILABLE = False
+      else:
+        np = numpy
+  return np if _NUMPY_AVAILABLE else None
+
+
+def _sqlite3():
+  '''returns the sqlite3 module, or None if it is not available'''
+  global sqlite3, _SQLITE3_AVAILABLE
+  if sqlite3 == None and _SQLITE3_AVAILABLE:
+    try:
+      import sqlite3 as module
+    except ImportError:
+      _SQLITE3_AVAILABLE = False
+    else:
+      sqlite3 = module
+  return sqlite3
 
-try:
-  import sqlite3
-except:
-  _SQLITE3_AVAILABLE = False
-else:
-  _SQLITE3_AVAILABLE = True
+
+def _dateparser():
+  '''returns dateutil.parser'''
+  global dateparser
+  if dateparser == None:
+    import dateutil.parser
+    dateparser = dateutil.parser
+  return dateparser
 
 
 def requires_numpy(f):
   """ Initial stab at the requires_numpy function - raises a warning """
   @wraps(f)
   def wrapper(*args, **kwargs):
-    if _NUMPY_AVAILABLE:
+    if _numpy(load=True) != None:
       return f(*args, **kwargs)
     else:
       raise Warning("Numpy not available.  Cannot call %s" % f.__name__)
@@ -42,7 +81,7 @@ def requires_numpy(f):
 def requires_SQLITE3(f):
   @wraps(f)
   def wrapper(*args, **kwargs):
-    if _SQLITE3_AVAILABLE:
+    if _sqlite3() != None:
       return f(*args, **kwargs)
     else:
       raise Warning("SQLITE3 not availible  Cannot call %s" % f.__name__)
@@ -63,22 +102,739 @@ def requires_heclib(f):
   return wrapper
 
 
+#result cache used by memoized methods, None while caching is disabled
+#(see enableResultCache)
+_resultCache = None
+#source of the identifiers that tell series apart in result cache keys
+_seriesIds = itertools.count()
+
+
+def memoized(f):
+  '''Caches the results of a timeseries method while the result cache is
+     enabled.  Results are keyed by (series, version, method, arguments),
+     so any insert or load into the series makes its old results stale.
+     Calls with unhashable arguments, or that set self.status, are not
+     cached.  Callers get copies, so they can modify the results.
+  '''
+
+  @wraps(f)
+  def wrapper(self, *args, **kwargs):
+    cache = _resultCache
+    if cache == None:
+      return f(self, *args, **kwargs)
+    try:
+      #the identity and length of data catch direct edits of self.data
+      key = (self._uid, self.version, id(self.data), len(self.data),
+             f.__name__, args, tuple(sorted(kwargs.items())))
+      hash(key)
+    except TypeError:
+      return f(self, *args, **kwargs)
+    found, output = cache.get(key)
+    if not found:
+      status = self.status
+      output = f(self, *args, **kwargs)
+      if self.status != status:
+        return output
+      cache.put(key, output)
+    return _copyResult(output)
+
+  return wrapper
+
+
+def _copyResult(value):
+  '''copies a cached result, down to the rows of timeseries'''
+  if isinstance(value, timeseries):
+    output = timeseries(columnar=value.isColumnar())
+    output.data = value.data[:] if value.isColumnar() else \
+        [line[:] for line in value.data]
+    output.status = value.status
+    return output
+  if isinstance(value, dict):
+    return {k: _copyResult(v) for k, v in value.items()}
+  if isinstance(value, list):
+    return [_copyResult(v) for v in value]
+  if isinstance(value, tuple):
+    return tuple(_copyResult(v) for v in value)
+  return value
+
+
+#operators with a bulk implementation in timeseries.operation()
+#maps to the name of the matching numpy ufunc
+_BULK_OPERATORS = {
+    operator.add: "add",
+    operator.sub: "subtract",
+    operator.mul: "multiply",
+    operator.truediv: "divide"
+}
+
+
+#rows buffered per bulk insert when streaming SQLITE3 or TSV reads
+_BATCH = 65536
+
+#timestamp formats tried by fromTSV, in order, before falling back to dateutil
+_TIMESTAMP_FORMATS = [
+    "%d-%b-%Y %H%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M", "%m/%d/%Y", "%d-%b-%Y %H:%M:%S", "%d-%b-%Y %H:%M",
+    "%d-%b-%Y", "%d%b%Y %H%M", "%d%b%Y %H:%M"
+]
+
+#strftime directives that depend on the time of day, see _timeFormatter
+_TIME_DIRECTIVES = "HIklMSfp"
+#strftime directives that depend on the date
+_DATE_DIRECTIVES = "aAwdbBmyYjUWuVgGeChn%"
+#lines joined per chunk by the streaming text writers
+_TEXT_CHUNK = 4096
+
+_MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
+}
+
+
+def _epoch(t):
+  '''converts a datetime to seconds past the unix epoch (local time), the
+     timestamps of binary files and SQLITE3 tables'''
+  return t.timestamp()
+
+
+def _fromEpoch(t):
+  '''converts seconds past the unix epoch to a datetime (local time)'''
+  return datetime.datetime.fromtimestamp(t)
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _wallSeconds(t):
+  '''converts a naive datetime to seconds past 1970-01-01 on the same wall
+     clock, the columnstore key.  No time zone is applied, so datetimes
+     inside a DST gap keep distinct keys like they do in the list engine.
+  '''
+  return (t - _EPOCH).total_seconds()
+
+
+def _fromWallSeconds(s):
+  '''inverse of _wallSeconds'''
+  return _EPOCH + datetime.timedelta(seconds=s)
+
+
+def _shiftRuns(times, offset):
+  '''returns an array of t + offset(t) for every t in times
+     Local time offsets only change at DST transitions, months apart, so
+     when times are sorted offset is looked up once per run of times under a
+     week long whose ends agree, instead of once per time.
+  '''
+  if not _isIncreasing(times):
+    return array('d', [t + offset(t) for t in times])
+  output = array('d', bytes(8 * len(times)))
+  runs = [(0, len(times))]
+  while runs:
+    a, b = runs.pop()
+    if a == b:
+      continue
+    d = offset(times[a])
+    if times[b - 1] - times[a] < 604800 and offset(times[b - 1]) == d:
+      output[a:b] = array('d', [t + d for t in times[a:b]])
+    else:
+      m = (a + b) // 2
+      runs.append((a, m))
+      runs.append((m, b))
+  return output
+
+
+def _wallFromEpoch(times):
+  '''converts local epoch times (binary files, SQLITE3) to an array of
+     columnstore keys'''
+  localtime = time.localtime
+  return _shiftRuns(times, lambda t: localtime(t).tm_gmtoff)
+
+
+def _epochFromWall(times):
+  '''converts columnstore keys to an array of local epoch times'''
+  return _shiftRuns(times, lambda t: _epoch(_fromWallSeconds(t)) - t)
+
+
+def _isIncreasing(a):
+  '''returns True if the sequence a is strictly increasing'''
+  if len(a) < 2:
+    return True
+  return all(map(operator.lt, a, a[1:]))
+
+
+def _seek(seq, key, c, rows=True):
+  '''bisect_left position of key in sorted seq, seq holds [datetime, value]
+     rows, or plain sort keys when rows is False.
+     c is the position returned by the previous lookup, it is checked
+     first so lookups with increasing keys cost amortized O(1)
+  '''
+  n = len(seq)
+  if c > n:
+    c = n
+  if rows:
+    if c > 0 and seq[c - 1][0] >= key:
+      return _bisectRows(seq, key, 0, c - 1)
+    if c < n and key <= seq[c][0]:
+      return c
+    if c + 1 < n and key <= seq[c + 1][0]:
+      return c + 1
+    return _bisectRows(seq, key, min(c + 2, n), n)
+  if c > 0 and seq[c - 1] >= key:
+    return bisect_left(seq, key, 0, c - 1)
+  if c < n and key <= seq[c]:
+    return c
+  if c + 1 < n and key <= seq[c + 1]:
+    return c + 1
+  return bisect_left(seq, key, min(c + 2, n), n)
+
+
+if sys.version_info >= (3, 10):
+
+  def _bisectRows(rows, key, lo, hi, time=operator.itemgetter(0)):
+    '''bisect_left on the timestamps of [datetime, value] rows'''
+    return bisect_left(rows, key, lo, hi, key=time)
+
+else:
+
+  def _bisectRows(rows, key, lo, hi):
+    '''bisect_left on the timestamps of [datetime, value] rows'''
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if rows[mid][0] < key:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo
+
+
+def _differing(a, b, tolerance):
+  '''returns the indices where the floats of a and b differ by more than
+     tolerance, NaNs are equal to each other'''
+  np = _numpy()
+  if np != None:
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    with np.errstate(invalid="ignore"):
+      same = (a == b) | (np.abs(a - b) <= tolerance) | (np.isnan(a) & np.isnan(b))
+    return np.flatnonzero(~same).tolist()
+  return [
+      i for i, (x, y) in enumerate(zip(a, b))
+      if not (x == y or abs(x - y) <= tolerance or (x != x and y != y))
+  ]
+
+
+def _parseTSLite(s):
+  '''fast path for the "%d-%b-%Y %H%M" timestamps written by __str__'''
+  if len(s) != 16 or s[2] != "-" or s[6] != "-" or s[11] != " ":
+    raise ValueError("'%s' does not match format '%%d-%%b-%%Y %%H%%M'" % s)
+  try:
+    month = _MONTHS[s[3:6].title()]
+  except KeyError:
+    raise ValueError("unknown month in '%s'" % s)
+  return datetime.datetime(
+      int(s[7:11]), month, int(s[0:2]), int(s[12:14]), int(s[14:16]))
+
+
+def _strptimeParser(fmt):
+  strptime = datetime.datetime.strptime
+  return lambda s: strptime(s, fmt)
+
+
+def _timestampParser(samples):
+  '''Detects the timestamp format from a list of sample strings
+     returns a function that parses a string into a datetime, using the
+     detected format and falling back to fuzzy dateutil parsing on mismatch
+  '''
+  candidates = [_parseTSLite, datetime.datetime.fromisoformat]
+  candidates += [_strptimeParser(fmt) for fmt in _TIMESTAMP_FORMATS[1:]]
+  parse = None
+  for candidate in candidates:
+    try:
+      for sample in samples:
+        candidate(sample)
+      parse = candidate
+      break
+    except ValueError:
+      pass
+
+  def parser(s):
+    if parse != None:
+      try:
+        return parse(s)
+      except ValueError:
+        pass
+    return _dateparser().parse(s, fuzzy=True)
+
+  return parser
+
+
+def _timeFormatter(fmt):
+  '''returns a function equivalent to lambda t: t.strftime(fmt)
+     The date and time of day parts of fmt are formatted separately and
+     cached, so regular series only call strftime once per day and once per
+     time of day.  Formats with other directives are not cached.
+  '''
+  import re
+  parts = re.split(r'(%.)', fmt)
+  directives = [p[1] for p in parts if len(p) == 2 and p[0] == "%"]
+  if any(d not in _TIME_DIRECTIVES and d not in _DATE_DIRECTIVES
+         for d in directives):
+    return lambda t: t.strftime(fmt)
+  timeParts = [p for p in parts
+               if len(p) == 2 and p[0] == "%" and p[1] in _TIME_DIRECTIVES]
+  dateFmt = "".join("\x01" if p in timeParts else p for p in parts)
+  timeFmt = "\x01".join(timeParts)
+  #only the time of day fields that fmt uses are part of the cache key
+  used = "".join(p[1] for p in timeParts)
+  depth = 4 if "f" in used else 3 if "S" in used else 2
+  dates = {}
+  times = {}
+
+  def formatter(t):
+    d = t.date()
+    template = dates.get(d)
+    if template == None:
+      template = t.strftime(dateFmt).replace("{", "{{").replace("}", "}}")
+      template = template.replace("\x01", "{}")
+      dates[d] = template
+    if not timeParts:
+      return template
+    tod = (t.hour, t.minute, t.second, t.microsecond)[:depth]
+    values = times.get(tod)
+    if values == None:
+      if len(times) > 100000:
+        times.clear()
+      values = t.strftime(timeFmt).split("\x01")
+      times[tod] = values
+    return template.format(*values)
+
+  return formatter
+
+
+def _calendarFloor(t, unit):
+  '''returns the start of the calendar hour, day, month, year or
+     water year ("wy", starting October 1st) containing datetime t'''
+  if unit == "hour":
+    return t.replace(minute=0, second=0, microsecond=0)
+  t = t.replace(hour=0, minute=0, second=0, microsecond=0)
+  if unit == "day":
+    return t
+  if unit == "month":
+    return t.replace(day=1)
+  if unit == "year":
+    return t.replace(month=1, day=1)
+  if unit == "wy":
+    return t.replace(year=t.year if t.month > 9 else t.year - 1, month=10, day=1)
+  raise ValueError("Unknown calendar alignment %s" % unit)
+
+
+def _calendarIndex(t, unit):
+  '''numbers calendar months, years and water years consecutively'''
+  if unit == "month":
+    return t.year * 12 + t.month - 1
+  if unit == "year":
+    return t.year
+  return t.year + 1 if t.month > 9 else t.year
+
+
+def _calendarStart(k, unit):
+  '''inverse of _calendarIndex, returns the start of period k'''
+  if unit == "month":
+    return datetime.datetime(k // 12, k % 12 + 1, 1)
+  if unit == "year":
+    return datetime.datetime(k, 1, 1)
+  return datetime.datetime(k - 1, 10, 1)
+
+
+def _waterYearKey(t):
+  '''returns (water year, time of water year) for datetime t, the time of
+     water year orders samples within a water year, and samples from
+     different years with the same month, day and time of day share it'''
+  day = ((t.month + 2) % 12) * 31 + t.day - 1
+  return (t.year + 1 if t.month > 9 else t.year,
+          day * 86400.0 + t.hour * 3600 + t.minute * 60 + t.second +
+          t.microsecond / 1e6)
+
+
+def _waterYearTime(WY, slot):
+  '''inverse of _waterYearKey, returns None when the date does not exist
+     in water year WY'''
+  day, seconds = divmod(slot, 86400.0)
+  month = (int(day) // 31 + 9) % 12 + 1
+  try:
+    t = datetime.datetime(WY - 1 if month > 9 else WY, month, int(day) % 31 + 1)
+  except ValueError:
+    return None
+  return t + datetime.timedelta(seconds=round(seconds, 6))
+
+
+def _quantile(run, q):
+  '''linearly interpolated quantile q (0 to 1) of sorted list run'''
+  pos = (len(run) - 1) * q
+  lo = int(pos)
+  hi = min(lo + 1, len(run) - 1)
+  return run[lo] + (run[hi] - run[lo]) * (pos - lo)
+
+
+#calendar bucket names accepted by resample in place of an interval
+_CALENDAR = ("month", "year", "wy")
+
+#pure python aggregations used by resample, keyed by name
+_AGGREGATES = {
+    "sum": sum,
+    "mean": lambda v: sum(v) / len(v),
+    "min": min,
+    "max": max,
+    "count": len,
+    "first": lambda v: v[0],
+    "last": lambda v: v[-1]
+}
+
+
+def _bucketer(interval, anchor):
+  '''returns (index, start, end) functions for buckets of a timedelta or
+     _CALENDAR interval anchored at datetime anchor.
+     index(t) numbers the bucket that holds t, samples before anchor fall in
+     bucket 0 and a zero interval puts everything in bucket 0.
+     start(k) and end(k) return the bounds of bucket k.
+  '''
+  if interval in _CALENDAR:
+    first = _calendarIndex(anchor, interval)
+    return (lambda t: max(_calendarIndex(t, interval), first),
+            lambda k: _calendarStart(k, interval),
+            lambda k: _calendarStart(k + 1, interval))
+  if interval <= datetime.timedelta(0):
+    index = lambda t: 0
+  else:
+    index = lambda t: max((t - anchor) // interval, 0)
+  return (index, lambda k: anchor + interval * k,
+          lambda k: anchor + interval * (k + 1))
+
+
+def _sortRows(rows):
+  '''sorts [key, value] rows by key, the last row wins on duplicate keys'''
+  if _isIncreasing([row[0] for row in rows]):
+    return rows
+  rows.sort(key=operator.itemgetter(0))  #stable, keeps batch order of duplicates
+  output = []
+  for row in rows:
+    if output and output[-1][0] == row[0]:
+      output[-1] = row
+    else:
+      output.append(row)
+  return output
+
+
+def _mergeRows(a, b):
+  '''linear two-way merge of sorted [key, value] rows, b wins on duplicate keys'''
+  output = []
+  i, j = 0, 0
+  na, nb = len(a), len(b)
+  while i < na and j < nb:
+    if a[i][0] < b[j][0]:
+      output.append(a[i])
+      i += 1
+    elif a[i][0] > b[j][0]:
+      output.append(b[j])
+      j += 1
+    else:
+      output.append(b[j])
+      i += 1
+      j += 1
+  output.extend(a[i:])
+  output.extend(b[j:])
+  return output
+
+
+def _slidingWindows(keys, vals, windows):
+  '''Time based sliding window kernel, one pass over the data.
+     keys, vals: sorted timestamps and their values
+     windows: iterable of (start, end) pairs, both non-decreasing, inclusive
+     yields (lo, hi, n, mean, variance) for each window, where
+     keys[lo:hi] are the n samples inside it.
+     Running sums are kept on values shifted by the first value so the
+     variance does not suffer from cancellation on large magnitudes.
+  '''
+  count = len(keys)
+  k = vals[0] if count else 0.0
+  lo, hi = 0, 0
+  s, ss = 0.0, 0.0
+  for start, end in windows:
+    while hi < count and keys[hi] <= end:
+      d = vals[hi] - k
+      s += d
+      ss += d * d
+      hi += 1
+    while lo < hi and keys[lo] < start:
+      d = vals[lo] - k
+      s -= d
+      ss -= d * d
+      lo += 1
+    n = hi - lo
+    if n == 0:
+      s, ss = 0.0, 0.0
+      yield lo, hi, 0, None, None
+      continue
+    m = s / n
+    yield lo, hi, n, k + m, max(ss / n - m * m, 0.0)
+
+
+#v3 binary format, all integers little endian:
+#  header  "TSL3", version, points per block
+#  blocks  block header (first and last time, count, payload size), payload
+#  index   one block header plus file offset per block
+#  trailer index offset, block count, "TSL3"
+#times are integer microseconds after the epoch
+_V3_MAGIC = b"TSL3"
+_V3_HEADER = struct.Struct("<4sHI")
+_V3_BLOCK = struct.Struct("<qqII")
+_V3_INDEX = struct.Struct("<QqqI")
+_V3_TRAILER = struct.Struct("<QI4s")
+_V3_BLOCK_SIZE = 1024
+#(prefix, width) of the signed delta-of-delta fields, a zero delta-of-delta
+#is the single bit "0", width 64 is a raw delta-of-delta
+_V3_DOD = (("10", 14), ("110", 24), ("1110", 36), ("1111", 64))
+
+
+def _encodeBlockV3(times, vals):
+  '''encodes one block, times as delta-of-delta and values Gorilla style,
+     XORed with the previous value and stored as the meaningful bits
+     times: integer microseconds, vals: floats
+     returns the payload bytes
+  '''
+  bits = []
+  put = bits.append
+  prev, delta = times[0], 0
+  for t in times[1:]:
+    dod = t - prev - delta
+    delta = t - prev
+    prev = t
+    if dod == 0:
+      put("0")
+      continue
+    for prefix, width in _V3_DOD:
+      if -(1 << (width - 1)) <= dod < 1 << (width - 1):
+        put(prefix)
+        put(format(dod & ((1 << width) - 1), "0%db" % width))
+        break
+  words = array('Q')
+  words.frombytes(array('d', vals).tobytes())
+  prev = words[0]
+  put(format(prev, "064b"))
+  lead, tail = 65, 0
+  for w in words[1:]:
+    x = w ^ prev
+    prev = w
+    if x == 0:
+      put("0")
+      continue
+    l = min(64 - x.bit_length(), 31)
+    tz = (x & -x).bit_length() - 1
+    if l >= lead and tz >= tail:
+      #the previous window holds the meaningful bits
+      put("10")
+    else:
+      lead, tail = l, tz
+      put("11")
+      put(format(l, "05b"))
+      put(format((64 - l - tz) & 63, "06b"))
+    put(format(x >> tail, "0%db" % (64 - lead - tail)))
+  bits = "".join(bits)
+  bits += "0" * (-len(bits) % 8)
+  return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+
+def _decodeBlockV3(payload, first, count):
+  '''inverse of _encodeBlockV3, returns (times, vals) arrays of epoch
+     seconds and values'''
+  bits = format(int.from_bytes(payload, "big"), "0%db" % (8 * len(payload)))
+  pos = 0
+  t, delta = first, 0
+  times = [t]
+  for i in range(count - 1):
+    if bits[pos] == "1":
+      for prefix, width in _V3_DOD:
+        if bits.startswith(prefix, pos):
+          pos += len(prefix)
+          dod = int(bits[pos:pos + width], 2)
+          if dod >> (width - 1):
+            dod -= 1 << width
+          delta += dod
+          pos += width - 1
+          break
+    pos += 1
+    t += delta
+    times.append(t)
+  w = int(bits[pos:pos + 64], 2)
+  pos += 64
+  words = array('Q', [w])
+  lead, tail = 0, 0
+  for i in range(count - 1):
+    if bits[pos] == "1":
+      if bits[pos + 1] == "1":
+        lead = int(bits[pos + 2:pos + 7], 2)
+        tail = 64 - lead - (int(bits[pos + 7:pos + 13], 2) or 64)
+        pos += 11
+      pos += 2
+      n = 64 - lead - tail
+      w ^= int(bits[pos:pos + n], 2) << tail
+      pos += n - 1
+    pos += 1
+    words.append(w)
+  vals = array('d')
+  vals.frombytes(words.tobytes())
+  return array('d', [t / 1e6 for t in times]), vals
+
+
+class columnstore:
+  '''Columnar storage engine for timeseries.data
+     Timestamps are stored as wall clock seconds past 1970-01-01 (see
+     _wallSeconds) and values as doubles in
+     two parallel array('d') buffers, 16 bytes per point.
+     Indexing and iteration return [datetime, value] compatibility views, so
+     code that touches ts.data[i] keeps working.  Views are copies, assign
+     back through ts.data[i] = [datetime, value] to change a row.
+     Missing values (None) are stored as NaN.
+  '''
+
+  def __init__(self, rows=None):
+    self.times = array('d')
+    self.vals = array('d')
+    if rows != None:
+      for row in rows:
+        self.append(row)
+
+  def __len__(self):
+    return len(self.times)
+
+  def __iter__(self):
+    vals = self.vals
+    for i, t in enumerate(self.times):
+      yield [_fromWallSeconds(t), vals[i]]
+
+  def __getitem__(self, idx):
+    if isinstance(idx, slice):
+      output = columnstore()
+      output.times = self.times[idx]
+      output.vals = self.vals[idx]
+      return output
+    return [_fromWallSeconds(self.times[idx]), self.vals[idx]]
+
+  def __setitem__(self, idx, row):
+    self.times[idx] = _wallSeconds(row[0])
+    self.vals[idx] = self._float(row[1])
+
+  def __eq__(self, other):
+    if isinstance(other, columnstore):
+      return self.times == other.times and self.vals == other.vals
+    try:
+      if len(self) != len(other):
+        return False
+      for a, b in zip(self, other):
+        if a[0] != b[0] or a[1] != b[1]:
+          return False
+    except TypeError:
+      return False
+    return True
+
+  def __ne__(self, other):
+    return not self.__eq__(other)
+
+  def __repr__(self):
+    return "columnstore(%d points)" % len(self)
+
+  def _float(self, value):
+    if value == None:
+      return float("nan")
+    return float(value)
+
+  def append(self, row):
+    '''appends a [datetime, value] row, rows are assumed to be in order'''
+    self.times.append(_wallSeconds(row[0]))
+    self.vals.append(self._float(row[1]))
+
+  def insert(self, idx, row):
+    '''inserts a [datetime, value] row before idx'''
+    self.times.insert(idx, _wallSeconds(row[0]))
+    self.vals.insert(idx, self._float(row[1]))
+
+  def put(self, datestamp, value):
+    '''Inserts a timestamp, value keeping the columns sorted.
+       Existing timestamps are overwritten.
+    '''
+    t = _wallSeconds(datestamp)
+    v = self._float(value)
+    times = self.times
+    if len(times) == 0 or t > times[-1]:
+      times.append(t)
+      self.vals.append(v)
+      return
+    i = bisect_left(times, t)
+    if times[i] == t:
+      self.vals[i] = v
+    else:
+      times.insert(i, t)
+      self.vals.insert(i, v)
+
+  def putMany(self, pairs):
+    '''Inserts a batch of (epoch seconds, float value) pairs in one pass
+       Existing timestamps are overwritten, the last pair wins within a batch.
+    '''
+    pairs = _sortRows(pairs)
+    if not pairs:
+      return
+    #both columns are built before either is changed, so a bad pair leaves
+    #the store as it was
+    if len(self.times) == 0 or pairs[0][0] > self.times[-1]:
+      times = array('d', [p[0] for p in pairs])
+      vals = array('d', [p[1] for p in pairs])
+      self.times.extend(times)
+      self.vals.extend(vals)
+      return
+    merged = _mergeRows(list(zip(self.times, self.vals)), pairs)
+    times = array('d', [p[0] for p in merged])
+    vals = array('d', [p[1] for p in merged])
+    self.times, self.vals = times, vals
+
+  def between(self, starttime, endtime):
+    '''returns a columnstore of rows between starttime and endtime (inclusive)'''
+    a = bisect_left(self.times, _wallSeconds(starttime))
+    b = bisect_right(self.times, _wallSeconds(endtime))
+    return self[a:b]
+
+  def timestamps(self):
+    return [_fromWallSeconds(t) for t in self.times]
+
+  def values(self):
+    return self.vals.tolist()
+
+
 class timeseries:
 
-  def __init__(self, data=None):
+  def __init__(self, data=None, columnar=False):
     '''"overloaded" timeseries constructor
         expects data to be tuple of (datetime obj, observation value)
+        columnar: set to True to use the array backed columnstore engine,
+                  it stores values as doubles so None reads back as NaN
     '''
     self.status = "OK"
     #Data is a nested list with the following structure [datetime, float value,``]
-    self.data = []
+    #or a columnstore when the columnar engine is used
+    self.data = columnstore() if columnar else []
     self.decimals = 3
+    #(line number, message) tuples for lines fromTSV could not parse
+    self.parseErrors = []
+    #position of the last findIndex lookup, where the next one starts
+    self._cursor = 0
+    #bumped by every insert and load, keys the result cache
+    self.version = 0
+    self._uid = next(_seriesIds)
     if data != None:
       #set internal data member to data and filter out blanks
-      for row in data:
-        if len(row) > 1:
-          if row[1] != None:
-            self.safeinsert(row[0], row[1])
+      self.insertMany([
+          self._safeRow(row[0], row[1])
+          for row in data
+          if len(row) > 1 and row[1] != None
+      ])
 
   #========================================================================
   # IO and data manipulation methods
@@ -87,14 +843,41 @@ class timeseries:
   def __str__(self):
     '''Equivalent to toString() in other languages
      returns a tab delineated timeseries'''
-    output = ""
-    template = "%s\t%.3f\n"
-    for line in self.data:
-      try:
-        output += template % (line[0].strftime("%d-%b-%Y %H%M"), line[1])
-      except:
-        output += "%s\t\t\n" % line[0].strftime("%d-%b-%Y %H%M")
-    return output
+    return "".join(self.iterTSV())
+
+  def _rows(self):
+    '''iterates (datetime, value) pairs without building row lists'''
+    if self.isColumnar():
+      return zip(map(_fromWallSeconds, self.data.times), self.data.vals)
+    return ((line[0], line[1]) for line in self.data)
+
+  def _iterText(self, timefmt, template, missing, separator=""):
+    '''Streams self as text, one template per row, in chunks of joined lines
+       template is formatted with (timestamp, value), missing with timestamp
+       when the value is None or not a number
+    '''
+    fmt = _timeFormatter(timefmt)
+    lines = []
+    first = True
+    for t, v in self._rows():
+      stamp = fmt(t)
+      if v == None or v != v:
+        lines.append(missing % stamp)
+      else:
+        try:
+          lines.append(template % (stamp, v))
+        except TypeError:
+          lines.append(missing % stamp)
+      if len(lines) >= _TEXT_CHUNK:
+        yield ("" if first else separator) + separator.join(lines)
+        first = False
+        lines = []
+    if lines:
+      yield ("" if first else separator) + separator.join(lines)
+
+  def iterTSV(self):
+    '''generates the tab delineated text of __str__ in chunks'''
+    return self._iterText("%d-%b-%Y %H%M", "%s\t%.3f\n", "%s\t\t\n")
 
   def __getitem__(self, idx):
     ''' returns (gets) a timeslice from self.data from supplied index.
@@ -110,18 +893,46 @@ class timeseries:
     '''Checks to see if a timeseries is equal to another
        you can specify how many decimal places to check.
        default is six decimals"
+       Only values are compared, position by position, use equals() to
+       compare timestamps too.
     '''
-    fmt = '.' + str(precision) + 'f'
-    if other == None:
+    if not isinstance(other, timeseries):
       return False
-    if len(self.data) == 0 and len(other.data) == 0:
-      return True
     if len(self.data) != len(other.data):
       return False
-    for i in range(len(self.data)):
-      if format(self.data[i][1], fmt) != format(other.data[i][1], fmt):
+    return not _differing(self.values(), other.values(), 10**-precision)
+
+  def equals(self, other, tolerance=1e-6):
+    '''returns True if other has the same timestamps as self and values
+       within tolerance, NaNs are equal to each other'''
+    if not isinstance(other, timeseries) or len(self.data) != len(other.data):
+      return False
+    if self.isColumnar() and other.isColumnar():
+      if self.data.times != other.data.times:
         return False
-    return True
+    elif self.timestamps() != other.timestamps():
+      return False
+    return not _differing(
+        self.data.vals if self.isColumnar() else self.values(),
+        other.data.vals if other.isColumnar() else other.values(), tolerance)
+
+  def isColumnar(self):
+    '''returns True if self.data is backed by the columnstore engine'''
+    return isinstance(self.data, columnstore)
+
+  def toColumnar(self):
+    '''returns a copy of self backed by the columnstore engine'''
+    output = timeseries(columnar=True)
+    if self.isColumnar():
+      output.data = self.data[:]
+    else:
+      output.data = columnstore(self.data)
+    return output
+
+  def lazy(self):
+    '''returns a pipeline that records chained operations on self and runs
+       them in one fused pass when collected, see pipeline'''
+    return pipeline(self)
 
   def toDict(self):
     '''Turns self.data into a dictionary for efficiency purposes'''
@@ -131,16 +942,14 @@ class timeseries:
     return output
 
   def timestamps(self):
-    output = []
-    for i in range(len(self.data)):
-      output.append(self.data[i][0])
-    return output
+    if self.isColumnar():
+      return self.data.timestamps()
+    return [line[0] for line in self.data]
 
   def values(self):
-    output = []
-    for i in range(len(self.data)):
-      output.append(self.data[i][1])
-    return output
+    if self.isColumnar():
+      return self.data.values()
+    return [line[1] for line in self.data]
 
   def toPlot(self):
     '''Format timeseries for plotting by returning:
@@ -153,7 +962,7 @@ class timeseries:
   def saveTSV(self, path):
     '''Outputs the timeseries to a tab separated file'''
     f = open(path, "w")
-    f.write(str(self))
+    f.writelines(self.iterTSV())
     f.close()
 
   def loadTSV(self, path):
@@ -166,19 +975,55 @@ class timeseries:
 
   def fromTSV(self, lines):
     '''reads a timeseries from a TSV string 
+       The timestamp format is detected once from the first lines, lines that
+       do not match it fall back to dateutil.
+       Lines that fail to parse are listed in self.parseErrors as
+       (line number, message) tuples and summarized in self.status
        This method mutates the object, and also returns a pointer to self.
     '''
+    self.parseErrors = []
+    parse = None
+    pending = []  #(line number, tokens) read before the format is known
+    rows = []
+
+    def addRow(count, tokens):
+      try:
+        rows.append([parse(tokens[0]), float(tokens[1])])
+      except Exception as e:
+        self.parseErrors.append((count, str(e)))
+
     count = 0
     for s in lines:
       count += 1
-      s = re.sub(r'#.*', '', s)  # Strip comments
-      if re.match(r'\S', s):  # Ignore blank lines
-        tokens = s.split("\t")
-        try:
-          if len(tokens) > 1:
-            self.safeinsert(tokens[0], float(tokens[1]))
-        except:
-          self.status = "Error Parsing line %u" % (count)
+      i = s.find("#")  # Strip comments
+      if i != -1:
+        s = s[:i]
+      if not s or s[0].isspace():  # Ignore blank lines
+        continue
+      tokens = s.split("\t")
+      if len(tokens) < 2:
+        continue
+      if parse == None:
+        pending.append((count, tokens))
+        if len(pending) < 5:
+          continue
+        parse = _timestampParser([p[1][0] for p in pending])
+        for p in pending:
+          addRow(*p)
+        continue
+      addRow(count, tokens)
+      if len(rows) >= _BATCH:
+        self.insertMany(rows)
+        rows = []
+    if parse == None and pending:
+      parse = _timestampParser([p[1][0] for p in pending])
+      for p in pending:
+        addRow(*p)
+    self.insertMany(rows)
+    if self.parseErrors:
+      self.status = "Error Parsing %u lines, first at line %u: %s" % (
+          len(self.parseErrors), self.parseErrors[0][0],
+          self.parseErrors[0][1])
     return self
 
   def saveBinary(self, path):
@@ -190,15 +1035,24 @@ class timeseries:
   def toBinary(self):
     '''Outputs the timeseries to a binary bytearray
        Uses doubles for time and 
+       Encodes in bulk by interleaving the time and value columns
     '''
-    o = bytearray()
-    for line in self.data:
-      a, b = (time.mktime(line[0].timetuple()), line[1])
-      o.extend(struct.pack("dd", a, b))
-    return o
-
-  def loadBinary(self, path):
-    '''Reads the timeseries from a binary file and inserts values into self'''
+    o = array('d', bytes(struct.calcsize("dd") * len(self.data)))
+    if self.isColumnar():
+      o[0::2] = _epochFromWall(self.data.times)
+      o[1::2] = self.data.vals
+    else:
+      o[0::2] = array('d', [_epoch(line[0]) for line in self.data])
+      o[1::2] = array('d', [line[1] for line in self.data])
+    return bytearray(o)
+
+  def loadBinary(self, path, start_time=None, end_time=None):
+    '''Reads the timeseries from a binary file and inserts values into self
+       start_time, end_time - optional datetimes, reads only that range
+       through a memory map (see loadBinaryRange)
+    '''
+    if start_time != None or end_time != None:
+      return self.loadBinaryRange(path, start_time, end_time)
     buf = bytearray(os.path.getsize(path))
     with open(path, "rb") as f:
       f.readinto(buf)
@@ -206,18 +1060,170 @@ class timeseries:
     f.close()
     return self
 
+  def loadBinaryRange(self, path, start_time=None, end_time=None):
+    '''Reads a range of a binary file into self without reading the whole file
+       The file is memory mapped, the timestamp column is binary searched in
+       place and only records between start_time and end_time (inclusive, like
+       subSlice) are decoded.  Either end may be None for an open range.
+       This method mutates the object, and also returns a pointer to self.
+    '''
+    with open(path, "rb") as f:
+      if os.fstat(f.fileno()).st_size < struct.calcsize("dd"):
+        return self
+      import mmap
+      with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = memoryview(mm)
+        self._fromBinaryRange(buf, start_time, end_time)
+        buf.release()
+    return self
+
+  def _fromBinaryRange(self, buf, start_time, end_time):
+    '''binary searches the timestamp column of a v2 buffer in place and
+       decodes only the records between start_time and end_time
+    '''
+    size = struct.calcsize("dd")
+    n = len(buf) // size
+    if n == 0:
+      return self
+    buf = buf[:n * size]
+    times = buf.cast('d')[0::2]
+    a = 0
+    b = n
+    if start_time != None:
+      a = bisect_left(times, _epoch(start_time))
+    if end_time != None:
+      b = bisect_right(times, _epoch(end_time))
+    times.release()
+    if a < b:
+      self.fromBinary(buf[a * size:b * size])
+    buf.release()
+    return self
+
   def fromBinary(self, buf):
-    '''Reads the timeseries from a binary buffer'''
+    '''Reads the timeseries from a binary buffer
+       The buffer is decoded in one call, records are appended directly
+       when they are sorted and newer than the data already in self
+    '''
     size = struct.calcsize("dd")
-    buflen = len(buf)
-    if buflen >= size:
-      i = 0
-      while i < buflen:
-        d = struct.unpack("dd", buf[i:i + size])
-        self.insert(datetime.datetime.fromtimestamp(d[0]), d[1])
-        i += size
+    n = len(buf) // size
+    if n == 0:
+      return self
+    o = array('d')
+    o.frombytes(memoryview(buf).cast('B')[:n * size])
+    times, vals = o[0::2], o[1::2]
+    self.version += 1
+    if self.isColumnar():
+      times = _wallFromEpoch(times)
+      if _isIncreasing(times) and (len(self.data) == 0 or
+                                   times[0] > self.data.times[-1]):
+        self.data.times.extend(times)
+        self.data.vals.extend(vals)
+      else:
+        self.data.putMany(list(zip(times, vals)))
+    elif _isIncreasing(times) and (len(self.data) == 0 or
+                                   times[0] > _epoch(self.data[-1][0])):
+      self.data.extend(
+          [[_fromEpoch(t), v] for t, v in zip(times, vals.tolist())])
+    else:
+      self.insertMany([[_fromEpoch(t), v] for t, v in zip(times, vals)])
     return self
 
+  def saveBinaryV3(self, path, block_size=_V3_BLOCK_SIZE):
+    '''Outputs the timeseries to a compressed v3 binary file'''
+    f = open(path, "wb")
+    f.write(self.toBinaryV3(block_size))
+    f.close()
+
+  def toBinaryV3(self, block_size=_V3_BLOCK_SIZE):
+    '''Outputs the timeseries to a compressed v3 binary bytearray
+       Points are written in blocks of block_size, timestamps delta-of-delta
+       encoded and values XOR encoded.  A footer indexes the time range of
+       every block so ranged reads only decode the blocks they need.
+    '''
+    if self.isColumnar():
+      times = _epochFromWall(self.data.times)
+    else:
+      times = [_epoch(line[0]) for line in self.data]
+    times = [round(t * 1e6) for t in times]
+    vals = self.values()
+    out = bytearray(_V3_HEADER.pack(_V3_MAGIC, 3, block_size))
+    index = []
+    for a in range(0, len(times), block_size):
+      t = times[a:a + block_size]
+      payload = _encodeBlockV3(t, vals[a:a + block_size])
+      index.append(_V3_INDEX.pack(len(out), t[0], t[-1], len(t)))
+      out += _V3_BLOCK.pack(t[0], t[-1], len(t), len(payload))
+      out += payload
+    offset = len(out)
+    out += b"".join(index)
+    out += _V3_TRAILER.pack(offset, len(index), _V3_MAGIC)
+    return out
+
+  def loadBinaryV3(self, path, start_time=None, end_time=None):
+    '''Reads a v3 binary file into self, only the blocks overlapping
+       start_time to end_time (inclusive, either may be None) are read and
+       decoded.  Files without the v3 header are read as v2 (loadBinary),
+       v1 files have no header and are read with loadBinaryV1.  A v3 header
+       without the matching trailer (a truncated file) is recorded in status.
+    '''
+    with open(path, "rb") as f:
+      header = f.read(_V3_HEADER.size)
+      if len(header) < _V3_HEADER.size or header[:4] != _V3_MAGIC:
+        return self.loadBinary(path, start_time, end_time)
+      magic = None
+      if os.fstat(f.fileno()).st_size >= _V3_HEADER.size + _V3_TRAILER.size:
+        f.seek(-_V3_TRAILER.size, os.SEEK_END)
+        offset, count, magic = _V3_TRAILER.unpack(f.read(_V3_TRAILER.size))
+      if magic != _V3_MAGIC:
+        self.status = "Not a v3 tslite binary, bad trailer in " + path
+        return self
+      f.seek(offset)
+      index = list(_V3_INDEX.iter_unpack(f.read(count * _V3_INDEX.size)))
+
+      def read(offset, size):
+        f.seek(offset)
+        return f.read(size)
+
+      return self._readBlocksV3(read, index, start_time, end_time)
+
+  def fromBinaryV3(self, buf, start_time=None, end_time=None):
+    '''Reads a v3 binary buffer, see loadBinaryV3'''
+    buf = memoryview(buf).cast('B')
+    if len(buf) < _V3_HEADER.size or buf[:4] != _V3_MAGIC:
+      return self._fromBinaryRange(buf, start_time, end_time)
+    magic = None
+    if len(buf) >= _V3_HEADER.size + _V3_TRAILER.size:
+      offset, count, magic = _V3_TRAILER.unpack_from(
+          buf, len(buf) - _V3_TRAILER.size)
+    if magic != _V3_MAGIC:
+      self.status = "Not a v3 tslite binary, bad trailer in buffer"
+      return self
+    index = list(_V3_INDEX.iter_unpack(buf[offset:offset + count * _V3_INDEX.size]))
+    return self._readBlocksV3(lambda offset, size: buf[offset:offset + size],
+                              index, start_time, end_time)
+
+  def _readBlocksV3(self, read, index, start_time, end_time):
+    '''decodes the indexed v3 blocks that overlap the time range into self
+       read(offset, size) returns bytes of the file
+    '''
+    start = -math.inf if start_time == None else _epoch(start_time)
+    end = math.inf if end_time == None else _epoch(end_time)
+    times, vals = array('d'), array('d')
+    for offset, first, last, count in index:
+      if last / 1e6 < start or first / 1e6 > end:
+        continue
+      header = _V3_BLOCK.unpack(read(offset, _V3_BLOCK.size))
+      t, v = _decodeBlockV3(
+          read(offset + _V3_BLOCK.size, header[3]), first, count)
+      a = bisect_left(t, start)
+      b = bisect_right(t, end)
+      times.extend(t[a:b])
+      vals.extend(v[a:b])
+    o = array('d', bytes(struct.calcsize("dd") * len(times)))
+    o[0::2] = times
+    o[1::2] = vals
+    return self.fromBinary(memoryview(o).cast("B"))
+
   def loadBinaryV1(self, path):
     '''Reads the timeseries from a binary file and inserts values into self'''
     buf = bytearray(os.path.getsize(path))
@@ -230,21 +1236,21 @@ class timeseries:
   def fromBinaryV1(self, buf):
     '''Reads the timeseries from a binary buffer'''
     size = struct.calcsize("iff")
-    buflen = len(buf)
-    if buflen >= size:
-      i = 0
-      while i < buflen:
-        d = struct.unpack("iff", buf[i:i + size])
-        self.insert(datetime.datetime.fromtimestamp(d[0]), d[1])
-        i += size
+    n = len(buf) // size
+    self.insertMany([[datetime.datetime.fromtimestamp(d[0]), d[1]]
+                     for d in struct.iter_unpack(
+                         "iff", memoryview(buf).cast('B')[:n * size])])
     return self
 
 
   @requires_SQLITE3
-  def SQLITE3connect(self, dbPath):
+  def SQLITE3connect(self, dbPath, wal=False, synchronous=None):
     '''
     Get a SQLITE 3 database connection
     dbPath - path to the database file  
+    wal - set to True to switch the database to write-ahead logging
+    synchronous - optional synchronous pragma, eg "NORMAL" or "OFF"
+                  NORMAL is safe with WAL and much faster for bulk writes
     '''
     #initialize with Default Configuration
     self.status = "OK"
@@ -254,6 +1260,14 @@ class timeseries:
       dbconn = sqlite3.connect(dbPath)
       if not dbconn:
         self.status = f"\nCould not connect to {dbPath}\n"
+      else:
+        if wal == True:
+          dbconn.execute("PRAGMA journal_mode=WAL")
+        if synchronous != None:
+          if str(synchronous).upper() not in ("OFF", "NORMAL", "FULL", "EXTRA",
+                                              "0", "1", "2", "3"):
+            raise ValueError("Invalid synchronous pragma %s" % synchronous)
+          dbconn.execute("PRAGMA synchronous={}".format(synchronous))
     except Exception as e:
       self.status = f"\nCould not connect to {dbPath}\n {str (e)}"
     return dbconn
@@ -263,6 +1277,46 @@ class timeseries:
     '''Disconnect from a SQLITE3 database connection '''
     dbconn.close()
 
+  def _insertEpochRows(self, rows, scale=1):
+    '''bulk inserts (epoch timestamp, value) rows, timestamps are divided by scale'''
+    if self.isColumnar():
+      times = _wallFromEpoch([d[0] / scale for d in rows])
+      self.data.putMany(
+          [(t, self.data._float(d[1])) for t, d in zip(times, rows)])
+    else:
+      self.insertMany([[_fromEpoch(d[0] / scale), d[1]] for d in rows])
+
+  def _readSQLITE3(self, conn, tsid, start_time, end_time, scale):
+    '''streams a single table timeseries from a SQLITE3 database
+       the range filter uses bound parameters so it is served by the
+       timestamp primary key
+    '''
+    cur = conn.cursor()
+    ts = timeseries(columnar=self.isColumnar())
+    sqltxt = "SELECT timestamp, val FROM " + tsid
+    where = []
+    params = []
+    if start_time != None:
+      where.append("timestamp >= ?")
+      params.append(int(_epoch(start_time) * scale))
+    if end_time != None:
+      where.append("timestamp <= ?")
+      params.append(int(_epoch(end_time) * scale))
+    if where:
+      sqltxt += " WHERE " + " AND ".join(where)
+    sqltxt += " ORDER BY timestamp"
+    try:
+      cur.execute(sqltxt, params)
+      rows = cur.fetchmany(_BATCH)
+      while rows:
+        ts._insertEpochRows(rows, scale)
+        rows = cur.fetchmany(_BATCH)
+    except Exception as e:
+      self.status = "\nCould not read %s\n" % tsid
+      self.status += "\n%s" + str(e)
+    cur.close()
+    return ts
+
   @requires_SQLITE3
   def loadSQLITE3(self, conn, tsid, start_time=None, end_time=None):
     '''loads a timeseries from a SQLITE3 database
@@ -273,24 +1327,7 @@ class timeseries:
     end_time - datetime
     Timestamps are stored in milliseconds after the unix epoch
     '''
-    cur = conn.cursor()
-    ts = timeseries()
-    sqltxt = "SELECT * FROM " + tsid
-    if start_time != None and end_time != None:
-      start = time.mktime(start_time.timetuple()*1000)
-      end = time.mktime(end_time.timetuple()*1000)
-      sqltxt += " WHERE timestamp >= " + str(
-          start) + " AND timestamp <= " + str(end)
-    try:
-      cur.execute(sqltxt)
-      rows = cur.fetchall()
-      for d in rows:
-        ts.insert(datetime.datetime.fromtimestamp(d[0]/1000), d[1])
-    except Exception as e:
-      self.status = "\nCould not read %s\n" % tsid
-      self.status += "\n%s" + str(e)
-    cur.close()
-    return ts
+    return self._readSQLITE3(conn, tsid, start_time, end_time, 1000)
 
   @requires_SQLITE3
   def loadSQLITE3v1(self, conn, tsid, start_time=None, end_time=None):
@@ -302,25 +1339,35 @@ class timeseries:
     end_time - datetime
     in v1 Timestamps are stored in seconds after the unix epoch
     '''
-    cur = conn.cursor()
-    ts = timeseries()
-    sqltxt = "SELECT * FROM " + tsid
-    if start_time != None and end_time != None:
-      start = time.mktime(start_time.timetuple())
-      end = time.mktime(end_time.timetuple())
-      sqltxt += " WHERE timestamp >= " + str(
-          start) + " AND timestamp <= " + str(end)
-    try:
-      cur.execute(sqltxt)
-      rows = cur.fetchall()
-      for d in rows:
-        ts.insert(datetime.datetime.fromtimestamp(d[0]), d[1])
-    except Exception as e:
-      self.status = "\nCould not read %s\n" % tsid
-      self.status += "\n%s" + str(e)
-    cur.close()
-    return ts
+    return self._readSQLITE3(conn, tsid, start_time, end_time, 1)
+
+  async def aloadBinary(self, path, start_time=None, end_time=None):
+    '''awaitable loadBinary, the read and decode run off the event loop
+       This method mutates the object, and also returns a pointer to self.
+    '''
+    return await _defaultAsyncLoader()._run(self.loadBinary, path, start_time,
+                                            end_time)
 
+  async def aloadTSV(self, path):
+    '''awaitable loadTSV, the read and parse run off the event loop
+       This method mutates the object, and also returns a pointer to self.
+    '''
+    return await _defaultAsyncLoader()._run(self.loadTSV, path)
+
+  async def aloadSQLITE3(self, dbPath, tsid, start_time=None, end_time=None):
+    '''awaitable loadSQLITE3, takes the database path rather than a
+       connection, connections are pooled per database
+       returns a new timeseries like loadSQLITE3
+    '''
+    return await _defaultAsyncLoader().loadSQLITE3(
+        dbPath, tsid, start_time, end_time, self.isColumnar())
+
+  def _sqlRows(self):
+    '''generates (milliseconds after the epoch, value) rows for SQLITE3'''
+    if self.isColumnar():
+      return ((int(t * 1000), v)
+              for t, v in zip(_epochFromWall(self.data.times), self.data.vals))
+    return ((int(_epoch(line[0]) * 1000), line[1]) for line in self.data)
 
   @requires_SQLITE3
   def saveSQLITE3(self, conn, tsid, replace_table=False):
@@ -330,22 +1377,39 @@ class timeseries:
     tsid - string LOC_PARAM
     replace_table = False - Set to true to replace the ts in the database
     Timestamps are stored in milliseconds after the unix epoch
+    All rows are written with one executemany in a single transaction, the
+    table is created or replaced in the same transaction so a failed write
+    leaves the previous table in place
     '''
     tsid = tsid.upper()
     try:
       cur = conn.cursor()
+      #sqlite3 only opens transactions implicitly before DML statements
+      if not conn.in_transaction:
+        cur.execute("BEGIN")
       if replace_table == True:
         cur.execute("CREATE TABLE IF NOT EXISTS {}(timestamp INTEGER PRIMARY KEY, val REAL)".format(tsid))
         cur.execute("DROP TABLE {}".format(tsid))
       cur.execute("CREATE TABLE IF NOT EXISTS {}(timestamp INTEGER PRIMARY KEY, val REAL)".format(tsid))
-      for line in self.data:
-        sqltxt = "INSERT OR REPLACE INTO {} VALUES(?, ?)".format(tsid)
-        cur.execute(sqltxt,(int(time.mktime(line[0].timetuple()) * 1000), line[1]))
+      sqltxt = "INSERT OR REPLACE INTO {} VALUES(?, ?)".format(tsid)
+      cur.executemany(sqltxt, self._sqlRows())
       conn.commit()
       cur.close()
     except Exception as e:
       self.status = "\nCould not store " + tsid
       self.status += "\n%s" % str(e)
+      if conn is not None:
+        try:
+          conn.rollback()
+        except Exception:
+          pass
+
+  def invalidate(self):
+    '''marks results cached for self as stale, call it after editing
+       self.data directly instead of through insert or the loaders'''
+    self.version += 1
+    if _resultCache != None:
+      _resultCache.invalidate(self)
 
   def getStatus(self):
     '''exceptions get dropped into self.status
@@ -363,47 +1427,72 @@ class timeseries:
     else:
       return None
 
+  def _index(self, key):
+    '''bisect_left position of datetime key, searched from the cursor left
+       by the previous lookup.  The list engine bisects the rows in place,
+       the columnar engine its time array.
+    '''
+    if self.isColumnar():
+      i = _seek(self.data.times, _wallSeconds(key), self._cursor, rows=False)
+    else:
+      i = _seek(self.data, key, self._cursor)
+    self._cursor = i
+    return i
+
   def findIndex(self, key):
     '''  returns the index of a given timestamp
     returns -1 if not found'''
-    imin = 0
-    imax = len(self.data) - 1
-    while (imax >= imin):
-      imid = imin + ((imax - imin) // 2)
-      if (self.data[imid][0] == key):
-        return imid
-      elif (self.data[imid][0] < key):
-        imin = imid + 1  #change min index to search upper subarray
-      else:
-        imax = imid - 1
-        #change max index to search lower subarray
+    i = self._index(key)
+    if i < len(self.data) and self.data[i][0] == key:
+      return i
     return -1  # Key not found
 
   def findClosestIndex(self, key):
     '''  returns the index of a given timestamp
-    returns closest index if not found'''
-    imin = 0
-    imax = len(self.data) - 1
-    while (imax >= imin):
-      imid = imin + ((imax - imin) // 2)
-      if (self.data[imid][0] == key):
-        return imid
-      elif (self.data[imid][0] < key):
-        imin = imid + 1  #change min index to search upper subarray
-      else:
-        imax = imid - 1
-        #change max index to search lower subarray
-    return imid  # Key not found
+    returns the index of the first later timestamp if not found,
+    or the last index'''
+    return min(self._index(key), len(self.data) - 1)
+
+  def findIndices(self, keys):
+    '''  returns the indices of a list of timestamps, -1 for the ones not
+    found.  Sorted keys are resolved in one forward pass over the series.'''
+    n = len(self.data)
+    if self.isColumnar():
+      times = self.data.times
+      keys = [_wallSeconds(key) for key in keys]
+      np = _numpy()
+      if np != None and n:
+        t = np.frombuffer(times)
+        i = np.minimum(np.searchsorted(t, keys), n - 1)
+        return np.where(t[i] == keys, i, -1).tolist()
+      seq, rows = times, False
+    else:
+      seq, rows = self.data, True
+    output = []
+    c = self._cursor
+    for key in keys:
+      c = _seek(seq, key, c, rows)
+      output.append(c if c < n and (seq[c][0] if rows else seq[c]) == key else -1)
+    self._cursor = c
+    return output
+
+  def _safeRow(self, datestamp, value):
+    '''takes raw input and returns a [datetime, float] row'''
+    if isinstance(datestamp, str):
+      datestamp = _dateparser().parse(datestamp, fuzzy=True)
+    return [datestamp, float(value)]
 
   def safeinsert(self, datestamp, value):
     '''takes raw input and attempts to make it work'''
-    if isinstance(datestamp, str):
-      datestamp = dateparser.parse(datestamp, fuzzy=True)
-    self.insert(datestamp, float(value))
+    self.insert(*self._safeRow(datestamp, value))
 
   def insert(self, datestamp, value, quality=0):
     '''Inserts a timestamp, value into the timseries.
        this module assumes that datetimes are in acending order, as such please use this method when adding data'''
+    self.version += 1
+    if self.isColumnar():
+      self.data.put(datestamp, value)
+      return
     l = len(self.data)
     if l == 0:
       self.data.append([datestamp, value])
@@ -425,6 +1514,28 @@ class timeseries:
       i += 1
     self.data.append([datestamp, value])
 
+  def insertMany(self, rows):
+    '''Inserts many [datetime, value] rows in one pass.
+       The batch is sorted if needed and merged with the existing data in
+       linear time, duplicate timestamps are resolved last-write-wins.
+       rows: iterable of [datetime, value] rows, a list or columnstore
+    '''
+    self.version += 1
+    if self.isColumnar():
+      if isinstance(rows, columnstore):
+        self.data.putMany(list(zip(rows.times, rows.vals)))
+      else:
+        self.data.putMany([(_wallSeconds(row[0]), self.data._float(row[1]))
+                           for row in rows])
+      return
+    rows = _sortRows([[row[0], row[1]] for row in rows])
+    if not rows:
+      return
+    if len(self.data) == 0 or rows[0][0] > self.data[-1][0]:
+      self.data.extend(rows)
+    else:
+      self.data = _mergeRows(self.data, rows)
+
   def truncate(self, precision):
     '''Truncates values in timeseries to a given number of decimal places
     '''
@@ -444,57 +1555,57 @@ class timeseries:
 
   def merge(self, other):
     '''Merges another timeseries into self, retruns resultant timeseries'''
-    output = timeseries(self.data)
-    for line in other.data:
-      output.insert(line[0], line[1])
+    output = timeseries(columnar=self.isColumnar())
+    output.insertMany(self.data)
+    output.insertMany(other.data)
     return output
 
   def diff(self, other):
-    '''Returns the differences between self and timeseries other governs'''
-    output = timeseries()
-    for slice in self.data:
-      i = other.findIndex(slice[0])
-      if i == -1:
-        continue
-      oslice = other.data[i]
-      if format(slice[1], '.6f') != format(oslice[1], '.6f'):
-        output.insert(oslice[0], oslice[1])
-    for slice in other.data:
-      i = self.findIndex(slice[0])
-      if i == -1:
-        output.insert(slice[0], slice[1])
+    '''Returns the differences between self and timeseries other governs
+       the rows of other that changed or are missing from self, see changes()
+    '''
+    change = self.changes(other)
+    output = change["changed"]
+    output.insertMany(change["added"].data)
     return output
 
   def toHTML(self, css="", thead=""):
     '''like __str__ only it outputs a HTML table'''
-    output = "<table " + css + ">"
-    output += thead
-    for line in self.data:
-      try:
-        output += "<tr><td>%s</td><td>&nbsp;&nbsp;%.2f</td></tr>" % (
-            line[0].strftime("%d-%b-%Y %H%M"), line[1])
-      except:
-        output += "<tr><td>%s</td><td> </td></tr>" % line[0].strftime(
-            "%d-%b-%Y %H%M")
-    return output + "</table>"
+    return "".join(self.iterHTML(css, thead))
+
+  def iterHTML(self, css="", thead=""):
+    '''generates the HTML table of toHTML in chunks'''
+    yield "<table " + css + ">" + thead
+    yield from self._iterText("%d-%b-%Y %H%M",
+                              "<tr><td>%s</td><td>&nbsp;&nbsp;%.2f</td></tr>",
+                              "<tr><td>%s</td><td> </td></tr>")
+    yield "</table>"
 
   def toJS(self, var, timefmt="%m/%d/%Y %k:%M:%S"):
     '''returns self as a JS array'''
-    return "var %s = %s;\n" % (var, self.toJSON(timefmt=timefmt))
+    return "".join(self.iterJS(var, timefmt=timefmt))
+
+  def iterJS(self, var, timefmt="%m/%d/%Y %k:%M:%S"):
+    '''generates the JS array of toJS in chunks'''
+    yield "var %s = " % var
+    yield from self.iterJSON(timefmt=timefmt)
+    yield ";\n"
 
   def toJSON(self, timefmt="%m/%d/%Y %k:%M:%S"):
     '''returns self as a JSON object'''
-    output = []
-    for line in self.data:
-      try:
-        output.append('  ["%s",%.2f]' % (line[0].strftime(timefmt), line[1]))
-      except:
-        output.append('  ["%s", undefined]' % line[0].strftime(timefmt))
-    return "[\n%s\n]" % ",\n".join(output)
+    return "".join(self.iterJSON(timefmt=timefmt))
+
+  def iterJSON(self, timefmt="%m/%d/%Y %k:%M:%S"):
+    '''generates the JSON array of toJSON in chunks'''
+    yield "[\n"
+    yield from self._iterText(timefmt, '  ["%s",%.2f]', '  ["%s", undefined]',
+                              ",\n")
+    yield "\n]"
 
   def fromJSON(self,s):
     ts = timeseries()
     try:
+      import json
       j = json.loads(s)
       ts = timeseries(j)
     except Exception as e:
@@ -539,56 +1650,95 @@ class timeseries:
       self.status = str(e)
     return timeseries(_data)
 
-  def average(self, interval):
-    '''averages timeseries based on a given interval of type timedelta
+  @memoized
+  def resample(self, interval, how="mean", start=None, align=None,
+               label="end"):
+    '''Buckets the timeseries in a single pass and aggregates each bucket
+       interval: timedelta or relative time string (see TD) or one of
+                 "month", "year" or "wy" for calendar buckets.
+                 A zero interval puts every sample in one bucket
+       how: "sum", "mean", "min", "max", "count", "first", "last" or a
+            function that takes the list of values in a bucket
+       start: datetime that anchors the buckets, defaults to the first
+              timestamp. Samples before it fall in the first bucket
+       align: snaps the anchor to the start of the "hour", "day", "month",
+              "year" or water year ("wy") that contains it
+       label: "end" (default) or "start" of the bucket for output timestamps
+       Only buckets that contain samples are returned
        returns a timeseries object
     '''
-    interval = self.TD(interval)
     _data = []
     if self.data == []:
       return timeseries()
     try:
-      i = 0
-      count = len(self.data)
-      endTime = self.data[i][0]
-      while i < count:
-        startTime = endTime
-        endTime = startTime + interval
-        n = 0
-        sum = 0
-        while self.data[i][0] < endTime:
-          sum += self.data[i][1]
-          n += 1
-          i += 1
-          if i >= count:
-            break
-        if n != 0:
-          _data.append([endTime, sum / n])
+      keys = self.timestamps()
+      vals = self.values()
+      anchor = keys[0] if start == None else start
+      if align != None:
+        anchor = _calendarFloor(anchor, align)
+      if interval not in _CALENDAR:
+        interval = self.TD(interval)
+      #number each sample with its bucket, buckets are consecutive runs
+      bucket, bucketStart, bucketEnd = _bucketer(interval, anchor)
+      index = [bucket(t) for t in keys]
+      starts = [0]
+      starts.extend(i for i in range(1, len(index)) if index[i] != index[i - 1])
+      ends = starts[1:] + [len(index)]
+      np = _numpy()
+      if how not in ("sum", "mean", "min", "max") or np == None:
+        func = _AGGREGATES.get(how, how)
+        if not callable(func):
+          raise ValueError("Unknown aggregation %s" % how)
+        results = [func(vals[a:b]) for a, b in zip(starts, ends)]
+      else:
+        v = np.asarray(vals, dtype=float)
+        if how == "min":
+          results = np.minimum.reduceat(v, starts).tolist()
+        elif how == "max":
+          results = np.maximum.reduceat(v, starts).tolist()
+        else:
+          results = np.add.reduceat(v, starts)
+          if how == "mean":
+            results = results / np.diff(starts + [len(v)])
+          results = results.tolist()
+      stamp = bucketEnd if label == "end" else bucketStart
+      _data = [[stamp(index[a]), r] for a, r in zip(starts, results)]
     except Exception as e:
       self.status = str(e)
     return timeseries(_data)
 
+  @memoized
+  def average(self, interval):
+    '''averages timeseries based on a given interval of type timedelta
+       returns a timeseries object
+    '''
+    return self.resample(interval, "mean")
+
+  @memoized
   def globalAverage(self):
     '''averages entire timeseries returns a timeslice'''
     if len(self.data) != 0:
       interval = self.data[-1][0] - self.data[0][0]
-      return self.average(interval).data[0]
+      return self.resample(interval, "mean").data[0]
     return None
 
+  @memoized
   def globalMax(self):
     '''finds the max of a timeseries returns a timeslice'''
     if len(self.data) != 0:
       interval = self.data[-1][0] - self.data[0][0]
-      return self.maxmin(interval, lambda x, y: x > y).data[0]
+      return self.resample(interval, "max").data[0]
     return None
 
+  @memoized
   def globalMin(self):
     '''averages minimum of a timeseries returns a timeslice'''
     if len(self.data) != 0:
       interval = self.data[-1][0] - self.data[0][0]
-      return self.maxmin(interval, lambda x, y: x < y).data[0]
+      return self.resample(interval, "min").data[0]
     return None
 
+  @memoized
   def linreg(self):
     ''' returns a tuple of linear regression cooeficinets (m,b,r)
         for a line defined as y = mx+b
@@ -623,6 +1773,7 @@ class timeseries:
         (sumx2 - (sumx**2) / n) * (sumy2 - (sumy**2) / n))
     return (m, b, r)
 
+  @memoized
   def trendline(self):
     '''trendline performs a least squares regression on self. 
       Return a timeseries that contains the best fit values for each timeslice '''
@@ -656,22 +1807,37 @@ class timeseries:
 
   def movingstddev(self, interval):
     '''Returns a moving standard deviaton over specified interval.  
+       Each window starts at the first timestamp and steps by interval, the
+       result is stamped with the last timestamp inside the window.
        returns a timeseries object'''
-    output = timeseries()
+    _data = []
     interval = self.TD(interval)
-    if self.data != [] and interval.total_seconds != 0:
-      pointer = self.data[0][0]
-      while pointer < self.data[-1][0]:
-        stddev = self.subSlice(pointer, pointer + interval).stddev()
-        output.data.append(stddev)
-        pointer += interval
-    return output
+    if self.data == [] or interval.total_seconds() <= 0:
+      return timeseries()
+    try:
+      keys = self.timestamps()
+
+      def windows():
+        pointer = keys[0]
+        while pointer < keys[-1]:
+          yield pointer, pointer + interval
+          pointer += interval
+
+      for lo, hi, n, mean, var in _slidingWindows(keys, self.values(), windows()):
+        if n != 0:
+          _data.append([keys[hi - 1], math.sqrt(var)])
+    except Exception as e:
+      self.status = str(e)
+    return timeseries(_data)
 
   def subSlice(self, starttime, endtime):
     '''returns a timeseries betweeen the specified start and end datetimes'''
     output = timeseries()
     if self.data == []:
       return output
+    if self.isColumnar():
+      output.data = self.data.between(starttime, endtime)
+      return output
     if 1 == 1:
       pos = self.findClosestIndex(starttime)
       a = pos - 2  #subtract a few to be sure
@@ -686,73 +1852,134 @@ class timeseries:
         a += 1
     return output
 
-  def getWY(self, WY):
-    '''Gets a water year'''
+  def waterYearKeys(self):
+    '''computes the (water year, time of water year) key of every sample in
+       one pass, returns a tuple of two lists.
+       Pass it to getWY and climatology to reuse it across calls.
+    '''
+    wys = []
+    slots = []
+    for t in self.timestamps():
+      wy, slot = _waterYearKey(t)
+      wys.append(wy)
+      slots.append(slot)
+    return wys, slots
+
+  def getWY(self, WY, keys=None):
+    '''Gets a water year
+       keys: optional precomputed waterYearKeys()
+    '''
     starttime = datetime.datetime(year=WY - 1, month=10, day=1)
     endtime = datetime.datetime(year=WY, month=9, day=30)
-    return self.subSlice(starttime, endtime)
+    if keys == None:
+      return self.subSlice(starttime, endtime)
+    wys = keys[0]
+    a = bisect_left(wys, WY)
+    b = bisect_left(wys, WY + 1)
+    #like subSlice the water year ends at the start of September 30th
+    while b > a and self.data[b - 1][0] > endtime:
+      b -= 1
+    output = timeseries(columnar=self.isColumnar())
+    output.data = self.data[a:b] if self.isColumnar() else \
+        [line[:] for line in self.data[a:b]]
+    return output
 
-  def averageWY(self):
-    '''averages each element in the timeseries in previous water years
-    returns a timeseries object
+  @memoized
+  def climatology(self, stats=("mean", "min", "max", "median"), percentiles=(),
+                  WY=None, keys=None):
+    '''groups every sample by its time of water year across all water years
+       and reduces each group.
+       stats: any of "mean", "min", "max", "median", "count"
+       percentiles: percentiles from 0 to 100 to compute, named "p<n>"
+       WY: water year the traces are laid on, defaults to the last one.
+           Times that do not exist in that year (Feb 29th) are dropped.
+       keys: optional precomputed waterYearKeys()
+       returns a dictionary of timeseries objects keyed by statistic name
     '''
-
-    def toWY(t):
-      output = t.year
-      if t.month > 9:
-        output += 1
-      return output
-
-    def fromWY(year, month):
-      output = year
-      if month > 9:
-        output -= 1
+    output = {}
+    if len(self.data) == 0:
       return output
-
-    def inWY(WY, t):
-      if t.month < 10 and WY == t.year:
-        return True
-      if t.month > 9 and WY == (t.year + 1):
-        return True
-      return False
-
-    _data = []
-    if self.data == []:
-      return timeseries()
-    dd = self.toDict()
     try:
-      i = 0
-      startWY = toWY(self.data[0][0])
-      endWY = toWY(self.data[-1][0])
-      count = len(self.data)
-      #advance to the latest WY      
-      while i < count and not inWY(endWY, self.data[i][0]):
-        i += 1
-      #average current timeslice
-      while i < count:
-        sum = 0
-        t = self.data[i][0]
-        n = 0
-        for WY in range(startWY, endWY + 1):
-          try:
-            t2 = datetime.datetime(
-                year=fromWY(WY, t.month),
-                month=t.month,
-                day=t.day,
-                hour=t.hour,
-                minute=t.minute)
-            if t2 in dd:
-              val = self.data[dd[t2]][1]
-              n += 1
-              sum += val
-          except:
-            pass
-        if n != 0:
-          _data.append([t, sum / n])
-        i += 1
+      wys, slots = self.waterYearKeys() if keys == None else keys
+      if WY == None:
+        WY = wys[-1]
+      vals = self.values()
+      quantiles = [("median", 50.0)] if "median" in stats else []
+      quantiles += [("p%g" % q, float(q)) for q in percentiles]
+      np = _numpy()
+      if np != None:
+        #sort by slot then value so that every group is a sorted run
+        s = np.asarray(slots, dtype=float)
+        v = np.asarray(vals, dtype=float)
+        order = np.lexsort((v, s))
+        s = s[order]
+        v = v[order]
+        groups, starts, counts = np.unique(s, return_index=True,
+                                           return_counts=True)
+        results = {
+            "count": counts,
+            "mean": np.add.reduceat(v, starts) / counts,
+            "min": v[starts],
+            "max": v[starts + counts - 1]
+        }
+        for name, q in quantiles:
+          pos = starts + (counts - 1) * (q / 100.0)
+          lo = np.floor(pos).astype(int)
+          hi = np.minimum(lo + 1, starts + counts - 1)
+          results[name] = v[lo] + (v[hi] - v[lo]) * (pos - lo)
+        groups = groups.tolist()
+        results = {k: r.tolist() for k, r in results.items()}
+      else:
+        grouped = {}
+        for slot, val in zip(slots, vals):
+          grouped.setdefault(slot, []).append(val)
+        groups = sorted(grouped)
+        runs = [sorted(grouped[slot]) for slot in groups]
+        results = {
+            "count": [len(r) for r in runs],
+            "mean": [sum(r) / len(r) for r in runs],
+            "min": [r[0] for r in runs],
+            "max": [r[-1] for r in runs]
+        }
+        for name, q in quantiles:
+          results[name] = [_quantile(r, q / 100.0) for r in runs]
+      names = [name for name in stats if name != "median"]
+      names += [name for name, q in quantiles]
+      for name in names:
+        if name not in results:
+          raise ValueError("Unknown statistic %s" % name)
+      traces = {name: [] for name in names}
+      for i, slot in enumerate(groups):
+        t = _waterYearTime(WY, slot)
+        if t == None:
+          continue
+        for name in names:
+          traces[name].append([t, results[name][i]])
+      for name in names:
+        output[name] = timeseries()
+        output[name].data = traces[name]
     except Exception as e:
       self.status = str(e)
-    return timeseries(_data)
+    return output
+
+  @memoized
+  def averageWY(self):
+    '''averages each element in the timeseries in previous water years
+    returns a timeseries object
+    '''
+    output = timeseries()
+    if len(self.data) == 0:
+      return output
+    keys = self.waterYearKeys()
+    means = self.climatology(("mean", ), keys=keys).get("mean")
+    if means == None:
+      return output
+    #report only the times sampled in the last water year
+    wys, slots = keys
+    current = set(slots[bisect_left(wys, wys[-1]):])
+    output.data = [line for line in means.data
+                   if _waterYearKey(line[0])[1] in current]
+    return output
 
   def runningTotal(self, override_startTime=None):
     '''Creates a timeseries containing a running total (partial sum)
@@ -764,37 +1991,11 @@ class timeseries:
       output.insert (row[0],sum)
     return output
 
+  @memoized
   def accumulate(self, interval, override_startTime=None):
     '''accumulates timeseries based on a given interval of type timedelta
      returns a timeseries object'''
-    interval = self.TD(interval)
-    _data = []
-    if self.data == []:
-      return timeseries()
-    try:
-      i = 0
-      count = len(self.data)
-      if override_startTime != None:
-        endTime = override_startTime
-      else:
-        endTime = self.data[i][0]
-      while i < count:
-        startTime = endTime
-        endTime = startTime + interval
-        
-        n = 0
-        sum = 0
-        while self.data[i][0] < endTime:
-          sum += self.data[i][1]
-          n += 1
-          i += 1
-          if i >= count:
-            break
-        if n != 0:
-          _data.append([endTime, sum])
-    except Exception as e:
-      self.status = str(e)
-    return timeseries(_data)
+    return self.resample(interval, "sum", start=override_startTime)
 
   def accumulateWY(self, interval, incrTS, offset=datetime.timedelta(days=0)):
     '''
@@ -860,31 +2061,12 @@ class timeseries:
 
   def maxmin(self, interval, cmp):
     '''returns a max or a min based for a given interval of type datetime
+       cmp: function that returns True if its first argument should replace
+            the second, eg lambda x, y: x > y for a max
        returns a timeseries object
     '''
-    interval = self.TD(interval)
-    _data = []
-    if self.data == []:
-      return timeseries()
-    try:
-      i = 0
-      count = len(self.data)
-      endTime = self.data[i][0]
-      while i < count:
-        startTime = endTime
-        endTime = startTime + interval
-        n = 0
-        probe = self.data[i][1]
-        while self.data[i][0] < endTime:
-          if cmp(self.data[i][1], probe):
-            probe = self.data[i][1]
-          i += 1
-          if i >= count:
-            break
-        _data.append([endTime, probe])
-    except Exception as e:
-      self.status = str(e)
-    return timeseries(_data)
+    return self.resample(
+        interval, lambda vals: reduce(lambda p, v: v if cmp(v, p) else p, vals))
 
   @requires_numpy
   def savitzky_golay(self, window_size, order, deriv=0, rate=1):
@@ -1001,23 +2183,16 @@ class timeseries:
     if self.data == []:
       return timeseries()
     try:
-      i = 0
-      count = len(self.data)
-      while i < count:
-        startTime = self.data[i][0]
-        endTime = startTime + interval
-        if endTime > self.data[-1][0]:
+      keys = self.timestamps()
+      last = keys[-1]
+      windows = []
+      for t in keys:
+        if t + interval > last:
           break
-        n = 0
-        sum = 0
-        while self.data[i + n][0] <= endTime:
-          sum += self.data[i + n][1]
-          n += 1
-          if i + n >= count:
-            break
-        if n != 0:
-          _data.append([endTime, sum / n])
-        i += 1
+        windows.append((t, t + interval))
+      for w, stats in zip(windows,
+                          _slidingWindows(keys, self.values(), windows)):
+        _data.append([w[1], stats[3]])
     except Exception as e:
       self.status = str(e)
     return timeseries(_data)
@@ -1030,57 +2205,29 @@ class timeseries:
     if self.data == []:
       return timeseries()
     try:
-      i = len(self.data) - 1
-      while i >= 0:
-        endTime = self.data[i][0]
-        startTime = endTime - interval
-        if startTime < self.data[0][0]:
-          break
-        
-        n = 0
-        sum = 0
-        while self.data[i - n][0] >= startTime:
-          sum += self.data[i - n][1]
-          n += 1
-          if i - n < 0:
-            break
-        if n != 0:
-          _data.append([endTime, sum / n])
-        i -= 1
+      keys = self.timestamps()
+      first = keys[0]
+      ends = [t for t in keys if t - interval >= first]
+      windows = [(t - interval, t) for t in ends]
+      for t, stats in zip(ends, _slidingWindows(keys, self.values(), windows)):
+        _data.append([t, stats[3]])
     except Exception as e:
       self.status = str(e)
     return timeseries(_data)
 
   def centerMovingAverage(self, interval):
     '''averages timeseries based on a given interval of type timedelta 
-      returns a timeseries object containing center moving average'''
+      returns a timeseries object containing center moving average
+      NOTE: the window runs from each timestamp to half an interval past it'''
     interval = self.TD(interval)
     _data = []
     if self.data == []:
       return timeseries()
     try:
-      i = 0
-      interval = interval
-      count = len(self.data)
-      while i < count:
-        startTime = self.data[i][0] - interval / 2
-        endTime = startTime + interval
-        if startTime > self.data[-1][0]:
-          break
-        if startTime < self.data[0][0]:
-          startTime = self.data[0][0]
-        if endTime > self.data[-1][0]:
-          endTime = self.data[-1][0]
-        n = 0
-        sum = 0
-        while self.data[i + n][0] <= endTime:
-          sum += self.data[i + n][1]
-          n += 1
-          if i + n >= count:
-            break
-        if n != 0:
-          _data.append([self.data[i][0], sum / n])
-        i += 1
+      keys = self.timestamps()
+      windows = [(t, t - interval / 2 + interval) for t in keys]
+      for t, stats in zip(keys, _slidingWindows(keys, self.values(), windows)):
+        _data.append([t, stats[3]])
     except Exception as e:
       self.status = str(e)
     return timeseries(_data)
@@ -1241,23 +2388,150 @@ class timeseries:
 
   def subtract(self, operand):
     '''Subtracts an operand timeseries or constant from self'''
-    return self.operation(lambda x, y: x - y, operand)
+    return self.operation(operator.sub, operand)
 
   def add(self, operand):
     '''Subtracts an operand timeseries or constant from self'''
-    return self.operation(lambda x, y: x + y, operand)
+    return self.operation(operator.add, operand)
 
   def mul(self, operand):
     '''multiplies an operand timeseries or constant to self'''
-    return self.operation(lambda x, y: x * y, operand)
+    return self.operation(operator.mul, operand)
 
   def div(self, operand):
     '''divides an self by an operand timeseries or constant'''
-    return self.operation(lambda x, y: x / y, operand)
+    return self.operation(operator.truediv, operand)
+
+  def align(self, other):
+    '''Aligns self with another timeseries in one sorted merge pass
+       returns two lists of indices (into self.data and other.data) of rows
+       whose timestamps match
+    '''
+    return self._join(other)[:2]
+
+  def _join(self, other, arrays=False):
+    '''merge joins the timestamps of self and other
+       returns four lists of indices: the matching rows of self and of
+       other, then the rows only in self and the rows only in other
+       arrays: return numpy index arrays instead of lists when the columnar
+               numpy join is used
+    '''
+    if self.isColumnar() and other.isColumnar():
+      a, b = self.data.times, other.data.times
+    else:
+      a, b = self.timestamps(), other.timestamps()
+    if a == b:
+      return list(range(len(a))), list(range(len(b))), [], []
+    np = _numpy()
+    if np != None and isinstance(a, array) and len(a) and len(b):
+      a, b = np.frombuffer(a), np.frombuffer(b)
+      common, ia, ib = np.intersect1d(a, b, assume_unique=True,
+                                      return_indices=True)
+      onlyA = np.ones(len(a), dtype=bool)
+      onlyA[ia] = False
+      onlyB = np.ones(len(b), dtype=bool)
+      onlyB[ib] = False
+      if arrays:
+        return ia, ib, np.flatnonzero(onlyA), np.flatnonzero(onlyB)
+      return (ia.tolist(), ib.tolist(), np.flatnonzero(onlyA).tolist(),
+              np.flatnonzero(onlyB).tolist())
+    ia, ib, oa, ob = [], [], [], []
+    i, j = 0, 0
+    na, nb = len(a), len(b)
+    while i < na and j < nb:
+      if a[i] == b[j]:
+        ia.append(i)
+        ib.append(j)
+        i += 1
+        j += 1
+      elif a[i] < b[j]:
+        oa.append(i)
+        i += 1
+      else:
+        ob.append(j)
+        j += 1
+    oa.extend(range(i, na))
+    ob.extend(range(j, nb))
+    return ia, ib, oa, ob
+
+  def _take(self, indices):
+    '''returns a timeseries of the rows of self at indices'''
+    output = timeseries(columnar=self.isColumnar())
+    if self.isColumnar():
+      output.data.times = array('d', [self.data.times[i] for i in indices])
+      output.data.vals = array('d', [self.data.vals[i] for i in indices])
+    else:
+      output.data = [[self.data[i][0], self.data[i][1]] for i in indices]
+    return output
+
+  def changes(self, other, tolerance=1e-6):
+    '''Compares self with other in one merge join of their timestamps
+       returns a change-set dictionary of timeseries:
+         "added" - rows of other at timestamps missing from self
+         "removed" - rows of self at timestamps missing from other
+         "changed" - rows of other whose values differ from self by more
+                     than tolerance, NaNs are equal to each other
+    '''
+    ia, ib, oa, ob = self._join(other)
+    vals = self.data.vals if self.isColumnar() else self.values()
+    ovals = other.data.vals if other.isColumnar() else other.values()
+    if oa or ob:
+      np = _numpy()
+      if np != None:
+        vals = np.asarray(vals, dtype=float)[ia]
+        ovals = np.asarray(ovals, dtype=float)[ib]
+      else:
+        vals = [vals[i] for i in ia]
+        ovals = [ovals[j] for j in ib]
+    changed = _differing(vals, ovals, tolerance)
+    return {
+        "added": other._take(ob),
+        "removed": self._take(oa),
+        "changed": other._take([ib[k] for k in changed])
+    }
+
+  def _bulkOperation(self, op, x, y):
+    '''applies a _BULK_OPERATORS op to values x and operand y (list or scalar)
+       returns a list of floats
+    '''
+    np = _numpy()
+    if np != None:
+      return self._bulkArray(np, op, x, y).tolist()
+    if isinstance(y, list):
+      return [float(op(a, b)) for a, b in zip(x, y)]
+    return [float(op(a, y)) for a in x]
+
+  def _bulkArray(self, np, op, x, y):
+    '''numpy _bulkOperation, returns an array'''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if op is operator.truediv and np.any(y == 0):
+      raise ZeroDivisionError("float division by zero")
+    return getattr(np, _BULK_OPERATORS[op])(x, y)
+
+  def _columnarOperation(self, np, op, operand):
+    '''bulk operation of a columnar self and a scalar or columnar operand
+       read straight from the columnstore buffers
+    '''
+    times = np.frombuffer(self.data.times)
+    x = np.frombuffer(self.data.vals)
+    y = operand
+    if isinstance(operand, timeseries):
+      y = np.frombuffer(operand.data.vals)
+      if self.data.times != operand.data.times:
+        ia, ib = self._join(operand, arrays=True)[:2]
+        times, x, y = times[ia], x[ia], y[ib]
+    output = timeseries(columnar=True)
+    output.data.times = array('d', times.tobytes())
+    output.data.vals = array('d', self._bulkArray(np, op, x, y).tobytes())
+    return output
 
   def operation(self, op, operand):
     '''Performs an operation on self
        op: lambda function to perform eg lambda x,y: x+y
+           operator.add, operator.sub, operator.mul and operator.truediv
+           are applied in bulk (vectorized when numpy is available), rows
+           where either value is None are skipped
        operand: could be a timeseries or a float
        returns a timeseries object
     '''
@@ -1265,14 +2539,47 @@ class timeseries:
     if self.data == []:
       return timeseries()
     try:
-      if type(operand) is float or type(operand) is int:
+      scalar = type(operand) is float or type(operand) is int
+      np = _numpy()
+      if (op in _BULK_OPERATORS and np != None and self.isColumnar() and
+          (scalar or operand.isColumnar())):
+        return self._columnarOperation(np, op, operand)
+      if scalar:
+        ia = list(range(len(self.data)))
+      else:
+        ia, ib = self.align(operand)
+      if op in _BULK_OPERATORS:
+        output = timeseries(columnar=self.isColumnar())
+        if self.isColumnar():
+          x = [self.data.vals[i] for i in ia]
+        else:
+          x = [self.data[i][1] for i in ia]
+        if scalar:
+          y = operand
+        elif operand.isColumnar():
+          y = [operand.data.vals[j] for j in ib]
+        else:
+          y = [operand.data[j][1] for j in ib]
+        if None in x or (not scalar and None in y):
+          keep = [k for k, a in enumerate(x)
+                  if a != None and (scalar or y[k] != None)]
+          ia = [ia[k] for k in keep]
+          x = [x[k] for k in keep]
+          if not scalar:
+            y = [y[k] for k in keep]
+        vals = self._bulkOperation(op, x, y)
+        if self.isColumnar():
+          output.data.times = array('d', [self.data.times[i] for i in ia])
+          output.data.vals = array('d', vals)
+        else:
+          output.data = [[self.data[i][0], v] for i, v in zip(ia, vals)]
+        return output
+      if scalar:
         for line in self.data:
           _data.append([line[0], op(line[1], operand)])
       else:
-        for line in self.data:
-          val = operand.findValue(line[0])
-          if val != None:
-            _data.append([line[0], op(line[1], val)])
+        for i, j in zip(ia, ib):
+          _data.append([self.data[i][0], op(self.data[i][1], operand.data[j][1])])
     except Exception as e:
       self.status = str(e)
       return timeseries()
@@ -1392,6 +2699,803 @@ class timeseries:
     return self.TD(input)
 
 
+class pipeline:
+  '''Lazy, fused chain of timeseries operations
+     Operations are recorded and run in one streaming pass over the source
+     rows when collect() is called or the pipeline is iterated, so no
+     intermediate timeseries are built.
+     Example: ts.lazy().subSlice(a, b).cullBelow(0).timeshift("1h").average("1d").collect()
+     Operands of cull and arithmetic must be constants.
+  '''
+
+  def __init__(self, source, ops=None):
+    self.source = source
+    self.ops = ops or []
+
+  def _then(self, op):
+    return pipeline(self.source, self.ops + [op])
+
+  def _rows(self):
+    '''source rows as (datetime, value) pairs, starting at a leading subSlice'''
+    src = self.source
+    lo = 0
+    if self.ops and self.ops[0][0] == "subSlice" and len(src.data) > 0:
+      lo = max(src.findClosestIndex(self.ops[0][1]) - 2, 0)
+    if src.isColumnar():
+      return zip(map(_fromWallSeconds, src.data.times[lo:]), src.data.vals[lo:])
+    return ((src.data[i][0], src.data[i][1]) for i in range(lo, len(src.data)))
+
+  def __iter__(self):
+    rows = self._rows()
+    for op in self.ops:
+      rows = getattr(self, "_" + op[0])(rows, *op[1:])
+    return (list(row) for row in rows)
+
+  def collect(self):
+    '''runs the pipeline, returns a timeseries object'''
+    output = timeseries(columnar=self.source.isColumnar())
+    output.insertMany(self)
+    return output
+
+  #------------------------------------------------------------------------
+  # recorded operations, see the timeseries methods of the same name
+  #------------------------------------------------------------------------
+
+  def subSlice(self, starttime, endtime):
+    return self._then(("subSlice", starttime, endtime))
+
+  def cull(self, op, operand):
+    if not isinstance(operand, (int, float)):
+      raise TypeError("pipeline.cull only supports constant operands")
+    return self._then(("cull", op, operand))
+
+  def cullAbove(self, operand):
+    return self.cull(operator.lt, operand)
+
+  def cullBelow(self, operand):
+    return self.cull(operator.gt, operand)
+
+  def cullEqual(self, operand):
+    return self.cull(operator.ne, operand)
+
+  def timeshift(self, tdelta):
+    return self._then(("timeshift", self.source.TD(tdelta)))
+
+  def operation(self, op, operand):
+    if not isinstance(operand, (int, float)):
+      raise TypeError("pipeline.operation only supports constant operands")
+    return self._then(("operation", op, operand))
+
+  def add(self, operand):
+    return self.operation(operator.add, operand)
+
+  def subtract(self, operand):
+    return self.operation(operator.sub, operand)
+
+  def mul(self, operand):
+    return self.operation(operator.mul, operand)
+
+  def div(self, operand):
+    return self.operation(operator.truediv, operand)
+
+  def round(self, precision):
+    return self._then(("round", precision))
+
+  def truncate(self, precision):
+    return self._then(("truncate", precision))
+
+  def resample(self, interval, how="mean", start=None, align=None,
+               label="end"):
+    #unlike timeseries.resample, which records bad arguments in status, the
+    #pipeline raises when the chain is built, like cull and operation, so a
+    #bad chain never fails part way through collect()
+    if interval not in _CALENDAR:
+      interval = self.source.TD(interval)
+      if not isinstance(interval, datetime.timedelta):
+        raise ValueError("Unknown interval %s" % interval)
+    if not callable(_AGGREGATES.get(how, how)):
+      raise ValueError("Unknown aggregation %s" % how)
+    return self._then(("resample", interval, how, start, align, label))
+
+  def average(self, interval):
+    return self.resample(interval, "mean")
+
+  def accumulate(self, interval, override_startTime=None):
+    return self.resample(interval, "sum", start=override_startTime)
+
+  #------------------------------------------------------------------------
+  # streaming implementations, each wraps an iterator of (datetime, value)
+  #------------------------------------------------------------------------
+
+  def _subSlice(self, rows, starttime, endtime):
+    rows = dropwhile(lambda row: row[0] < starttime, rows)
+    return takewhile(lambda row: row[0] <= endtime, rows)
+
+  def _cull(self, rows, op, operand):
+    return (row for row in rows if op(row[1], operand))
+
+  def _timeshift(self, rows, tdelta):
+    return ((t + tdelta, v) for t, v in rows)
+
+  def _operation(self, rows, op, operand):
+    return ((t, op(v, operand)) for t, v in rows)
+
+  def _round(self, rows, precision):
+    return ((t, round(v, precision)) for t, v in rows)
+
+  def _truncate(self, rows, precision):
+    fmt = f'.{str(precision)}f'
+    return ((t, float(format(v, fmt))) for t, v in rows)
+
+  def _resample(self, rows, interval, how, start, align, label):
+    func = _AGGREGATES.get(how, how)
+    for first in rows:
+      break
+    else:
+      return
+    anchor = first[0] if start == None else start
+    if align != None:
+      anchor = _calendarFloor(anchor, align)
+    bucket, bucketStart, bucketEnd = _bucketer(interval, anchor)
+    stamp = bucketEnd if label == "end" else bucketStart
+    rows = (row for chain in ((first,), rows) for row in chain)
+    for k, group in groupby(rows, key=lambda row: bucket(row[0])):
+      yield stamp(k), func([row[1] for row in group])
+
+
+def _batchLoad(source, db):
+  '''loads a batch source, a tsid when db is set, else a TSV or binary file'''
+  ts = timeseries()
+  if db != None:
+    loader = timeseries()
+    conn = loader.SQLITE3connect(db)
+    try:
+      ts = loader.loadSQLITE3(conn, source)
+      ts.status = loader.status
+    finally:
+      conn.close()
+  elif source.lower().endswith((".tsv", ".txt")):
+    ts.loadTSV(source)
+  else:
+    ts.loadBinary(source)
+  return ts
+
+
+def _batchWorker(task):
+  '''runs a batch spec on one series, module level so it can be pickled
+     task: (name, binary buffer or None, db, spec, save)
+     returns (name, binary buffer or None, error message or None)
+  '''
+  name, buf, db, spec, save = task
+  try:
+    if buf != None:
+      ts = timeseries().fromBinary(buf)
+    else:
+      ts = _batchLoad(name, db)
+    if ts.status != "OK":
+      return name, None, ts.getStatus().strip()
+    for step in spec:
+      method = step[0]
+      args = step[1] if len(step) > 1 else ()
+      kwargs = step[2] if len(step) > 2 else {}
+      output = getattr(ts, method)(*args, **kwargs)
+      status = ts.getStatus()
+      if status != "OK":
+        return name, None, "%s: %s" % (method, status.strip())
+      if isinstance(output, timeseries):
+        ts = output
+    if save != None:
+      conn = ts.SQLITE3connect(save)
+      try:
+        ts.saveSQLITE3(conn, name)
+      finally:
+        conn.close()
+      if ts.status != "OK":
+        return name, None, "saveSQLITE3: %s" % ts.getStatus().strip()
+    return name, bytes(ts.toBinary()), None
+  except Exception as e:
+    return name, None, "%s: %s" % (type(e).__name__, str(e))
+
+
+class batch:
+  '''Runs the same chain of timeseries methods over many series in a
+     process pool.
+     spec - picklable list of steps (method name, args tuple, kwargs dict),
+            args and kwargs are optional. Each step is called on the result
+            of the previous one, steps that do not return a timeseries
+            (like saveSQLITE3) keep the current one.
+            Example: [("snap", ("1h", "5m")), ("filldown", ("1h",))]
+     workers - number of processes, defaults to the CPU count; 0 runs the
+               batch in this process
+     Series travel between processes as toBinary() buffers.
+     Errors are collected per series in self.errors instead of being lost.
+  '''
+
+  def __init__(self, spec, workers=None):
+    self.status = "OK"
+    self.spec = [tuple(step) if not isinstance(step, str) else (step,)
+                 for step in spec]
+    self.workers = workers
+    self.errors = {}
+
+  def run(self, sources, db=None, save=None):
+    '''runs the spec over sources
+       sources - list of tsids (when db is set) or TSV/binary file paths,
+                 or a dict of name : timeseries
+       db - path to the SQLITE3 database that tsids are loaded from
+       save - path to a SQLITE3 database the results are saved to, by name
+       returns a dict of name : timeseries for the series that succeeded,
+       failures are listed in self.errors as name : message
+    '''
+    self.errors = {}
+    if isinstance(sources, dict):
+      tasks = [(name, bytes(ts.toBinary()), None, self.spec, save)
+               for name, ts in sources.items()]
+    else:
+      tasks = [(name, None, db, self.spec, save) for name in sources]
+    if self.workers == 0:
+      results = map(_batchWorker, tasks)
+    else:
+      from concurrent.futures import ProcessPoolExecutor
+      workers = self.workers or os.cpu_count() or 1
+      chunksize = max(1, len(tasks) // (4 * workers))
+      with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_batchWorker, tasks, chunksize=chunksize))
+    output = {}
+    for name, buf, error in results:
+      if error != None:
+        self.errors[name] = error
+      else:
+        output[name] = timeseries().fromBinary(buf)
+    if self.errors:
+      self.status = "%u of %u series failed" % (len(self.errors), len(tasks))
+    return output
+
+
+class asyncloader:
+  '''Loads many series concurrently from asyncio code.
+     Reads and decoding run on a bounded thread pool so the event loop
+     stays free, SQLITE3 connections are pooled per database file and
+     reused across loads.
+     workers - size of the thread pool, it bounds the number of loads and
+               of open connections per database
+     Errors from loadMany are collected in self.errors like batch.
+  '''
+
+  def __init__(self, workers=8):
+    import threading
+    self.status = "OK"
+    self.workers = workers
+    self.errors = {}
+    self._executor = None
+    #database path : idle connections
+    self._pools = {}
+    self._lock = threading.Lock()
+
+  def _run(self, func, *args):
+    import asyncio
+    if self._executor == None:
+      from concurrent.futures import ThreadPoolExecutor
+      self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                          thread_name_prefix="tslite")
+    return asyncio.get_running_loop().run_in_executor(self._executor, func,
+                                                      *args)
+
+  @requires_SQLITE3
+  def _readSQLITE3(self, db, tsid, start_time, end_time, columnar):
+    '''runs on the pool, borrows a connection to db for one read'''
+    with self._lock:
+      idle = self._pools.setdefault(db, [])
+      conn = idle.pop() if idle else None
+    if conn == None:
+      #each connection is used by one thread at a time
+      conn = sqlite3.connect(db, check_same_thread=False)
+    try:
+      loader = timeseries(columnar=columnar)
+      ts = loader.loadSQLITE3(conn, tsid, start_time, end_time)
+      ts.status = loader.status
+    finally:
+      with self._lock:
+        idle = self._pools.get(db)
+        if idle == None:
+          #close() ran during the read, do not leak the connection
+          conn.close()
+        else:
+          idle.append(conn)
+    return ts
+
+  async def loadBinary(self, path, start_time=None, end_time=None,
+                       columnar=False):
+    '''awaitable timeseries.loadBinary, returns a new timeseries'''
+    ts = timeseries(columnar=columnar)
+    return await self._run(ts.loadBinary, path, start_time, end_time)
+
+  async def loadTSV(self, path, start_time=None, end_time=None,
+                    columnar=False):
+    '''awaitable timeseries.loadTSV, returns a new timeseries
+       start_time, end_time - optional, the file is read whole and sliced
+    '''
+    return await self._run(self._readTSV, path, start_time, end_time,
+                           columnar)
+
+  def _readTSV(self, path, start_time, end_time, columnar):
+    ts = timeseries(columnar=columnar).loadTSV(path)
+    if len(ts.data) and (start_time != None or end_time != None):
+      status = ts.status
+      ts = ts.subSlice(start_time or ts.data[0][0], end_time or ts.data[-1][0])
+      ts.status = status
+    return ts
+
+  async def loadSQLITE3(self, db, tsid, start_time=None, end_time=None,
+                        columnar=False):
+    '''awaitable timeseries.loadSQLITE3 on the database file db'''
+    return await self._run(self._readSQLITE3, db, tsid, start_time, end_time,
+                           columnar)
+
+  async def load(self, source, db=None, start_time=None, end_time=None,
+                 columnar=False):
+    '''loads one source, a tsid when db is set, else a TSV or binary file'''
+    if db != None:
+      return await self.loadSQLITE3(db, source, start_time, end_time, columnar)
+    if source.lower().endswith((".tsv", ".txt")):
+      return await self.loadTSV(source, start_time, end_time, columnar)
+    return await self.loadBinary(source, start_time, end_time, columnar)
+
+  async def loadMany(self, sources, db=None, start_time=None, end_time=None,
+                     columnar=False):
+    '''loads sources concurrently, like asyncio.gather
+       sources - list of tsids (when db is set) or TSV/binary file paths
+       returns a dict of source : timeseries for the loads that succeeded,
+       failures are listed in self.errors as source : message
+    '''
+    import asyncio
+    self.errors = {}
+    results = await asyncio.gather(
+        *[self.load(source, db, start_time, end_time, columnar)
+          for source in sources],
+        return_exceptions=True)
+    output = {}
+    for source, ts in zip(sources, results):
+      if isinstance(ts, Exception):
+        self.errors[source] = "%s: %s" % (type(ts).__name__, str(ts))
+      elif ts.status != "OK":
+        self.errors[source] = ts.getStatus().strip()
+      else:
+        output[source] = ts
+    self.status = "OK"
+    if self.errors:
+      self.status = "%u of %u series failed" % (len(self.errors), len(sources))
+    return output
+
+  def close(self):
+    '''shuts the thread pool down and closes the pooled connections'''
+    if self._executor != None:
+      self._executor.shutdown()
+      self._executor = None
+    with self._lock:
+      for idle in self._pools.values():
+        for conn in idle:
+          conn.close()
+      self._pools = {}
+
+
+class _streamTotal:
+  '''running total (partial sum) of a stream, like timeseries.runningTotal'''
+
+  def __init__(self):
+    self.total = 0
+    self.output = timeseries()
+
+  def update(self, rows):
+    for t, v in rows:
+      self.total += v
+      self.output.data.append([t, self.total])
+
+  def result(self):
+    return self.output
+
+
+class _streamBuckets:
+  '''interval aggregation of a stream, like timeseries.resample
+     The last bucket stays open and its value is updated in place as points
+     arrive, so the output always matches resample over the whole series.
+  '''
+
+  def __init__(self, interval, how, start, align, label):
+    if how not in _AGGREGATES and not callable(how):
+      raise ValueError("Unknown aggregation %s" % how)
+    self.interval = interval if interval in _CALENDAR else timeseries().TD(interval)
+    self.how = how
+    self.start = start
+    self.align = align
+    self.label = label
+    self.bucket = None
+    self.k = None
+    self.output = timeseries()
+
+  def _value(self):
+    if callable(self.how):
+      return self.how(self.values)
+    count, total, lo, hi, first, last = self.state
+    return {
+        "sum": total,
+        "mean": total / count,
+        "min": lo,
+        "max": hi,
+        "count": count,
+        "first": first,
+        "last": last
+    }[self.how]
+
+  def update(self, rows):
+    for t, v in rows:
+      if self.bucket == None:
+        anchor = t if self.start == None else self.start
+        if self.align != None:
+          anchor = _calendarFloor(anchor, self.align)
+        self.bucket, start, end = _bucketer(self.interval, anchor)
+        self.stamp = end if self.label == "end" else start
+      k = self.bucket(t)
+      if k != self.k:
+        #close the open bucket and open the next one
+        if self.k != None:
+          self.output.data[-1][1] = self._value()
+        self.k = k
+        self.state = [0, 0, v, v, v, v]
+        self.values = []
+        self.output.data.append([self.stamp(k), None])
+      if callable(self.how):
+        self.values.append(v)
+      else:
+        s = self.state
+        s[0] += 1
+        s[1] += v
+        s[2] = min(s[2], v)
+        s[3] = max(s[3], v)
+        s[5] = v
+    if self.k != None:
+      self.output.data[-1][1] = self._value()
+
+  def result(self):
+    return self.output
+
+
+class _streamSummary:
+  '''count, sum, mean and the min and max timeslices of a whole stream'''
+
+  def __init__(self):
+    self.count = 0
+    self.sum = 0
+    self.min = None
+    self.max = None
+
+  def update(self, rows):
+    for t, v in rows:
+      self.count += 1
+      self.sum += v
+      if self.min == None or v < self.min[1]:
+        self.min = [t, v]
+      if self.max == None or v > self.max[1]:
+        self.max = [t, v]
+
+  def result(self):
+    return {
+        "count": self.count,
+        "sum": self.sum,
+        "mean": self.sum / self.count if self.count else None,
+        "min": self.min,
+        "max": self.max
+    }
+
+
+class stream:
+  '''Append-only ingest into a timeseries with incrementally maintained
+     aggregates, so the work per tick scales with the new points rather
+     than the length of the history.
+     Points are pushed in batches or read from the end of a growing TSV or
+     binary file.  Points that are not newer than the last point already
+     ingested are counted in self.dropped and ignored.
+     ts - timeseries to append to, a new one by default
+  '''
+
+  def __init__(self, ts=None):
+    self.status = "OK"
+    self.ts = timeseries() if ts == None else ts
+    self.dropped = 0
+    self.aggregates = {}
+    #path : bytes already consumed
+    self._offsets = {}
+
+  def getStatus(self):
+    '''returns the status message and resets self.status to "OK"'''
+    s = self.status
+    self.status = "OK"
+    return s
+
+  def _register(self, name, aggregate):
+    aggregate.update(self.ts._rows())
+    self.aggregates[name] = aggregate
+    return self
+
+  def addRunningTotal(self, name="runningTotal"):
+    '''maintains timeseries.runningTotal()'''
+    return self._register(name, _streamTotal())
+
+  def addResample(self, name, interval, how="mean", start=None, align=None,
+                  label="end"):
+    '''maintains timeseries.resample() with the same arguments, for example
+       addResample("daily", "1d", "sum") for accumulate("1d")'''
+    return self._register(name,
+                          _streamBuckets(interval, how, start, align, label))
+
+  def addSummary(self, name="summary"):
+    '''maintains the count, sum, mean, and min and max timeslices'''
+    return self._register(name, _streamSummary())
+
+  def result(self, name):
+    '''returns the current value of aggregate name, a timeseries for
+       running totals and resamples, a dictionary for summaries'''
+    return self.aggregates[name].result()
+
+  def push(self, rows):
+    '''appends (datetime, value) rows, returns the number appended
+       Rows that repeat a timestamp within the batch keep the last value,
+       the others are counted in self.dropped
+    '''
+    last = self.ts.data[-1][0] if len(self.ts.data) else None
+    new = []
+    rows = [[row[0], row[1]] for row in rows if row[1] != None]
+    count = len(rows)
+    for row in _sortRows(rows):
+      if last == None or row[0] > last:
+        new.append(row)
+        last = row[0]
+    self.dropped += count - len(new)
+    if new:
+      self.ts.insertMany(new)
+      for aggregate in self.aggregates.values():
+        aggregate.update(new)
+    return len(new)
+
+  def _read(self, path, size=1, lines=False):
+    '''returns the bytes appended to path since the last read, whole
+       records of size bytes or whole lines only.  A file that shrank is
+       read again from the start.'''
+    offset = self._offsets.get(path, 0)
+    with open(path, "rb") as f:
+      end = os.fstat(f.fileno()).st_size
+      if end < offset:
+        offset = 0
+      f.seek(offset)
+      buf = f.read(end - offset)
+    if lines:
+      #leave a partly written last line for the next call
+      buf = buf[:buf.rfind(b"\n") + 1]
+    buf = buf[:len(buf) - len(buf) % size]
+    self._offsets[path] = offset + len(buf)
+    return buf
+
+  def tailTSV(self, path):
+    '''appends the complete lines added to a TSV file since the last call
+       returns the number of points appended'''
+    parsed = timeseries().fromTSV(
+        self._read(path, lines=True).decode().splitlines())
+    if parsed.status != "OK":
+      self.status = parsed.status
+    return self.push(parsed.data)
+
+  def tailBinary(self, path):
+    '''appends the records added to a v2 binary file since the last call
+       returns the number of points appended'''
+    buf = self._read(path, struct.calcsize("dd"))
+    return self.push(timeseries().fromBinary(buf).data)
+
+
+#shared by the timeseries.aload methods, created on first use
+_asyncLoader = None
+
+
+def _defaultAsyncLoader():
+  global _asyncLoader
+  if _asyncLoader == None:
+    _asyncLoader = asyncloader()
+  return _asyncLoader
+
+
+class catalog:
+  '''Multi-series SQLITE3 store
+     All series share one clustered table keyed by (series_id, timestamp)
+     and a registry that maps tsids to series ids, so many series can be
+     read or written in a single round trip.
+     Timestamps are stored in milliseconds after the unix epoch
+  '''
+
+  SERIES = "TSLITE_SERIES"
+  VALUES = "TSLITE_VALUES"
+  #tsids per query, keeps IN (...) lists under the SQLITE3 parameter limit
+  CHUNK = 500
+
+  def __init__(self, conn):
+    '''conn - SQLITE3 connection, tables are created if they do not exist'''
+    self.status = "OK"
+    self.conn = conn
+    self.createTables()
+
+  @requires_SQLITE3
+  def createTables(self):
+    cur = self.conn.cursor()
+    cur.execute("CREATE TABLE IF NOT EXISTS {}(series_id INTEGER PRIMARY KEY, "
+                "tsid TEXT UNIQUE NOT NULL)".format(self.SERIES))
+    cur.execute("CREATE TABLE IF NOT EXISTS {}(series_id INTEGER NOT NULL, "
+                "timestamp INTEGER NOT NULL, val REAL, "
+                "PRIMARY KEY(series_id, timestamp)) WITHOUT ROWID".format(
+                    self.VALUES))
+    self.conn.commit()
+    cur.close()
+
+  def getStatus(self):
+    '''returns the status message and resets self.status to "OK"'''
+    s = self.status
+    self.status = "OK"
+    return s
+
+  def _chunks(self, items):
+    items = list(items)
+    for i in range(0, len(items), self.CHUNK):
+      yield items[i:i + self.CHUNK]
+
+  @requires_SQLITE3
+  def tsids(self):
+    '''returns a list of all tsids in the catalog'''
+    cur = self.conn.execute("SELECT tsid FROM {} ORDER BY tsid".format(
+        self.SERIES))
+    return [row[0] for row in cur]
+
+  @requires_SQLITE3
+  def seriesIds(self, tsids, create=False):
+    '''returns a dict of tsid : series_id
+       create - register tsids that are not in the catalog yet
+    '''
+    tsids = [tsid.upper() for tsid in tsids]
+    cur = self.conn.cursor()
+    if create == True:
+      cur.executemany(
+          "INSERT OR IGNORE INTO {}(tsid) VALUES(?)".format(self.SERIES),
+          [(tsid,) for tsid in tsids])
+    output = {}
+    for chunk in self._chunks(tsids):
+      cur.execute(
+          "SELECT tsid, series_id FROM {} WHERE tsid IN ({})".format(
+              self.SERIES, ",".join("?" * len(chunk))), chunk)
+      output.update(cur.fetchall())
+    cur.close()
+    return output
+
+  @requires_SQLITE3
+  def save(self, series, replace=False):
+    '''saves many timeseries in one transaction
+       series - dict of tsid : timeseries
+       replace - set to True to replace the stored series instead of merging
+    '''
+    try:
+      ids = self.seriesIds(series.keys(), create=True)
+      cur = self.conn.cursor()
+      if replace == True:
+        cur.executemany(
+            "DELETE FROM {} WHERE series_id = ?".format(self.VALUES),
+            [(ids[tsid.upper()],) for tsid in series])
+
+      def rows():
+        for tsid, ts in series.items():
+          sid = ids[tsid.upper()]
+          for t, v in ts._sqlRows():
+            yield (sid, t, v)
+
+      cur.executemany(
+          "INSERT OR REPLACE INTO {} VALUES(?, ?, ?)".format(self.VALUES),
+          rows())
+      self.conn.commit()
+      cur.close()
+    except Exception as e:
+      self.conn.rollback()
+      self.status = "\nCould not store catalog series"
+      self.status += "\n%s" % str(e)
+
+  @requires_SQLITE3
+  def load(self, tsids, start_time=None, end_time=None, columnar=False):
+    '''loads many timeseries, one query per CHUNK tsids
+       tsids - list of tsids
+       start_time, end_time - optional datetimes
+       columnar - set to True to return columnar timeseries
+       returns a dict of tsid : timeseries, tsids not in the catalog are omitted
+    '''
+    output = {}
+    try:
+      ids = self.seriesIds(tsids)
+      names = dict((sid, tsid) for tsid, sid in ids.items())
+      cur = self.conn.cursor()
+      for chunk in self._chunks(names):
+        sqltxt = "SELECT series_id, timestamp, val FROM {} WHERE series_id IN ({})".format(
+            self.VALUES, ",".join("?" * len(chunk)))
+        params = list(chunk)
+        if start_time != None:
+          sqltxt += " AND timestamp >= ?"
+          params.append(int(_epoch(start_time) * 1000))
+        if end_time != None:
+          sqltxt += " AND timestamp <= ?"
+          params.append(int(_epoch(end_time) * 1000))
+        cur.execute(sqltxt + " ORDER BY series_id, timestamp", params)
+        for sid in chunk:
+          output[names[sid]] = timeseries(columnar=columnar)
+        sid, rows = None, []
+        for row in cur:
+          if row[0] != sid:
+            if rows:
+              output[names[sid]]._insertEpochRows(rows, 1000)
+            sid, rows = row[0], []
+          rows.append(row[1:])
+        if rows:
+          output[names[sid]]._insertEpochRows(rows, 1000)
+      cur.close()
+    except Exception as e:
+      self.status = "\nCould not read catalog series"
+      self.status += "\n%s" % str(e)
+    return output
+
+  @requires_SQLITE3
+  def delete(self, tsids):
+    '''removes series and their values from the catalog'''
+    ids = self.seriesIds(tsids)
+    cur = self.conn.cursor()
+    cur.executemany("DELETE FROM {} WHERE series_id = ?".format(self.VALUES),
+                    [(sid,) for sid in ids.values()])
+    cur.executemany("DELETE FROM {} WHERE series_id = ?".format(self.SERIES),
+                    [(sid,) for sid in ids.values()])
+    self.conn.commit()
+    cur.close()
+
+  @requires_SQLITE3
+  def migrate(self, tsids=None, v1=False, drop=False):
+    '''copies series from the one table per tsid layout into the catalog
+       tsids - tables to migrate, defaults to every table with timestamp
+               and val columns
+       v1 - set to True if the tables hold seconds after the epoch
+       drop - set to True to drop the old tables after copying
+       returns a list of migrated tsids
+    '''
+    cur = self.conn.cursor()
+    if tsids == None:
+      cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+      tsids = [row[0] for row in cur.fetchall()
+               if row[0].upper() not in (self.SERIES, self.VALUES)]
+    tables = []
+    for tsid in tsids:
+      cur.execute("PRAGMA table_info({})".format(tsid))
+      columns = [row[1].lower() for row in cur.fetchall()]
+      if "timestamp" in columns and "val" in columns:
+        tables.append(tsid)
+    scale = 1000 if v1 == True else 1
+    output = []
+    try:
+      ids = self.seriesIds(tables, create=True)
+      for tsid in tables:
+        cur.execute(
+            "INSERT OR REPLACE INTO {} SELECT ?, timestamp * ?, val FROM {}".format(
+                self.VALUES, tsid), (ids[tsid.upper()], scale))
+        output.append(tsid.upper())
+      if drop == True:
+        for tsid in tables:
+          cur.execute("DROP TABLE {}".format(tsid))
+      self.conn.commit()
+    except Exception as e:
+      self.conn.rollback()
+      self.status = "\nCould not migrate catalog series"
+      self.status += "\n%s" % str(e)
+      output = []
+    cur.close()
+    return output
+
+
 class rdb:
   #construtor rewrites a path to a RDB file
   def __init__(self, path):
@@ -1435,33 +3539,57 @@ class rdb:
     output = y0 + (x - x0) * m
     return output
 
-  def rate(self, indep):
-    """ Rate a single value based on linear interpolation. """
-    data = self.data
-    index = len(data) - 2
-    for i in range(len(data) - 1):
-      if indep < float(data[i + 1][0]):
-        index = i
-        break
-    return self.interpolateValue(
-        float(data[index][0]),
-        float(data[index][2]),
-        float(data[index + 1][0]), float(data[index + 1][2]), indep)
+  def compile(self):
+    '''compiles the INDEP and DEP columns into float arrays, this happens
+       automatically when data is replaced, call it after editing data in place
+    '''
+    self._compiled = {"data": self.data, "length": len(self.data)}
+    self._compiled[False, False] = (array('d', [float(row[0]) for row in self.data]),
+                                    array('d', [float(row[2]) for row in self.data]))
+    return self
+
+  def _columns(self, reverse=False, log=False):
+    '''returns the compiled (x, y) columns to interpolate on
+       reverse swaps the domain and range, log returns the logarithms of
+       the rows where both columns are positive
+    '''
+    compiled = getattr(self, "_compiled", None)
+    if compiled == None or compiled["data"] is not self.data or \
+        compiled["length"] != len(self.data):
+      compiled = self.compile()._compiled
+    key = (reverse, log)
+    if key not in compiled:
+      xs, ys = compiled[False, False]
+      if reverse:
+        xs, ys = ys, xs
+      if log:
+        rows = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+        xs = array('d', [row[0] for row in rows])
+        ys = array('d', [row[1] for row in rows])
+      compiled[key] = (xs, ys)
+    return compiled[key]
+
+  def _rateValue(self, x, reverse, log):
+    xs, ys = self._columns(reverse, log)
+    if log:
+      x = math.log(x)
+    #segment whose upper bound is the first value above x, the end segments
+    #extrapolate
+    i = min(max(bisect_right(xs, x), 1), len(xs) - 1) - 1
+    y = self.interpolateValue(xs[i], ys[i], xs[i + 1], ys[i + 1], x)
+    return math.exp(y) if log else y
+
+  def rate(self, indep, log=False):
+    """ Rate a single value based on linear interpolation.
+        log: interpolate linearly between the logarithms of both columns
+    """
+    return self._rateValue(indep, False, log)
 
-  def reverseRate(self, indep):
+  def reverseRate(self, indep, log=False):
     """ Reverse rate a single value based on linear interpolation
         This switches the domain and range of the RDB and rates it. 
     """
-    data = self.data
-    index = len(data) - 2
-    for i in range(len(data) - 1):
-      if indep < float(data[i + 1][2]):
-        index = i
-        break
-    return self.interpolateValue(
-        float(data[index][2]),
-        float(data[index][0]),
-        float(data[index + 1][2]), float(data[index + 1][0]), indep)
+    return self._rateValue(indep, True, log)
 
   rate2 = reverseRate  ## backwards compatibility
 
@@ -1486,19 +3614,49 @@ class rdb:
       indep = sum(ratingMap[key]) / float(len(ratingMap[key]))
       self.data.append([format(key, fmt), "0.00", format(indep, fmt), ""])
 
-  def rateTS(self, ts):
+  def _rateSeries(self, ts, reverse, log):
+    '''rates every value of ts, vectorized when numpy is loaded.
+       In log mode values that are not positive are dropped.
+    '''
+    output = timeseries(columnar=ts.isColumnar())
+    times = ts.data.times if ts.isColumnar() else ts.timestamps()
+    vals = ts.values()
+    if len(vals) == 0:
+      return output
+    if log and min(vals) <= 0:
+      rows = [(t, v) for t, v in zip(times, vals) if v > 0]
+      times = [row[0] for row in rows]
+      vals = [row[1] for row in rows]
+    np = _numpy()
+    if np == None:
+      rated = [self._rateValue(v, reverse, log) for v in vals]
+    else:
+      xs, ys = self._columns(reverse, log)
+      xs = np.frombuffer(xs, dtype=float)
+      ys = np.frombuffer(ys, dtype=float)
+      x = np.asarray(vals, dtype=float)
+      if log:
+        x = np.log(x)
+      i = np.clip(np.searchsorted(xs, x, side="right"), 1, len(xs) - 1) - 1
+      dx = xs[i + 1] - xs[i]
+      if np.any(dx == 0):
+        raise ZeroDivisionError("float division by zero")
+      y = ys[i] + (x - xs[i]) * ((ys[i + 1] - ys[i]) / dx)
+      rated = (np.exp(y) if log else y).tolist()
+    if ts.isColumnar():
+      output.data.times = array('d', times)
+      output.data.vals = array('d', rated)
+    else:
+      output.data = [[t, v] for t, v in zip(times, rated)]
+    return output
+
+  def rateTS(self, ts, log=False):
     """ Generates a new time series with rated values from another """
-    output = []
-    for line in ts.data:
-      output.append([line[0], self.rate(line[1])])
-    return timeseries(output)
+    return self._rateSeries(ts, False, log)
 
-  def reverseRateTS(self, ts):
+  def reverseRateTS(self, ts, log=False):
     """ Generates a new time series with reverse-rated values from another """
-    output = []
-    for line in ts.data:
-      output.append([line[0], self.rate2(line[1])])
-    return timeseries(output)
+    return self._rateSeries(ts, True, log)
 
   rateTS2 = reverseRateTS  ## backwards compatibility
 
@@ -1531,34 +3689,38 @@ class tablegrid:
       self.status = "\n%s" % str(e)
     return output
 
+  def compile(self):
+    '''precomputes the column (header row) and row (first column) axes,
+       this happens automatically when data is replaced, call it after
+       editing data in place
+    '''
+    #the last slot holds the table as a numpy array once rateTS needs it
+    self._axes = [self.data, len(self.data), self._axesOf(self.data), None]
+    return self
+
+  def _axesOf(self, arr):
+    '''returns the column and row axes of table arr as float arrays'''
+    return (array('d', arr[0][1:]), array('d', [row[0] for row in arr[1:]]))
+
+  def _cell(self, axis, val):
+    '''index of the table column or row starting the axis segment used to
+       interpolate val, the end segments extrapolate'''
+    return min(max(bisect_right(axis, val), 1), len(axis) - 1)
+
   def tableLookup(self, arr, colval, rowval):
     #Seek the coordinates
-    output = 0
-    x = 0
-    y = 0
-    maxcols = len(arr[0]) - 1
-    maxrows = len(arr) - 1
-    x = maxcols - 1  #default to end of list if not found
-    y = maxrows - 1
-    i = 1
-    while (i < maxcols):  #seeking coordinates for column values
-      if arr[0][i + 1] > colval:
-        x = i
-        i = maxcols  #exit loop
-      i += 1
-    i = 1
-    while (i < maxrows):  #seeking coorinate for row values
-      if arr[i + 1][0] > rowval:
-        y = i
-        i = maxrows  #exit loop
-      i += 1
-    if ((x == maxcols) or (y == maxrows)):
-      output = arr[y][x]
+    if arr is self.data:
+      if getattr(self, "_axes", None) == None or self._axes[0] is not arr or \
+          self._axes[1] != len(arr):
+        self.compile()
+      cols, rows = self._axes[2]
     else:
-      output = self.bilinear(arr[0][x], arr[y][0], arr[0][x + 1], arr[y + 1][0],
-                             arr[y][x], arr[y + 1][x], arr[y][x + 1],
-                             arr[y + 1][x + 1], colval, rowval)
-    return output
+      cols, rows = self._axesOf(arr)
+    x = self._cell(cols, colval)
+    y = self._cell(rows, rowval)
+    return self.bilinear(arr[0][x], arr[y][0], arr[0][x + 1], arr[y + 1][0],
+                         arr[y][x], arr[y + 1][x], arr[y][x + 1],
+                         arr[y + 1][x + 1], colval, rowval)
 
   def bilinear(self, x1, y1, x2, y2, fQ11, fQ12, fQ21, fQ22, x, y):
     retval = (fQ11 / ((x2 - x1) * (y2 - y1))) * (x2 - x) * (y2 - y) + (fQ21 / (
@@ -1569,14 +3731,260 @@ class tablegrid:
 
   #this takes 2 timseries objects and rates them
   def rateTS(self, cols, rows):
-    output = []
-    for line in cols.data:
-      rowval = rows.findValue(line[0])
-      if rowval != None:
-        output.append(
-            [line[0], self.tableLookup(self.data, line[1], rowval)])
-    return timeseries(output)
+    '''rates the values of cols against the values of rows at matching
+       timestamps, the series are aligned in one merge pass and rated at
+       once when numpy is loaded
+    '''
+    ia, ib = cols.align(rows)
+    times = cols.timestamps()
+    colvals = cols.values()
+    rowvals = rows.values()
+    times = [times[i] for i in ia]
+    colvals = [colvals[i] for i in ia]
+    rowvals = [rowvals[j] for j in ib]
+    output = timeseries()
+    np = _numpy()
+    if np == None or len(times) == 0:
+      output.data = [[t, self.tableLookup(self.data, c, r)]
+                     for t, c, r in zip(times, colvals, rowvals)]
+      return output
+    self.tableLookup(self.data, colvals[0], rowvals[0])  #compiles the axes
+    if self._axes[3] is None:
+      self._axes[3] = np.asarray(self.data, dtype=float)
+    grid = self._axes[3]
+    xs, ys = grid[0], grid[:, 0]
+    c = np.asarray(colvals, dtype=float)
+    r = np.asarray(rowvals, dtype=float)
+    cols, rows = self._axes[2]
+    x = np.clip(np.searchsorted(np.frombuffer(cols), c, side="right"), 1, len(cols) - 1)
+    y = np.clip(np.searchsorted(np.frombuffer(rows), r, side="right"), 1, len(rows) - 1)
+    if np.any((xs[x + 1] - xs[x]) * (ys[y + 1] - ys[y]) == 0):
+      raise ZeroDivisionError("float division by zero")
+    output.data = [[t, v] for t, v in zip(times, self.bilinear(
+        xs[x], ys[y], xs[x + 1], ys[y + 1], grid[y, x], grid[y + 1, x],
+        grid[y, x + 1], grid[y + 1, x + 1], c, r).tolist())]
+    return output
 
 
 #Alias so we don't break backward compatibility
 timeSeries = timeseries
+
+#========================================================================
+# Opt-in instrumentation
+#========================================================================
+
+#per method metrics, keyed by "class.method"
+_metrics = {}
+#hook called with (name, event) after every instrumented call
+_metricsHook = None
+#original methods replaced by enableInstrumentation, keyed by (class, name)
+_uninstrumented = {}
+#per thread stacks of the instrumented calls in progress, see instrumented
+_calls = None
+
+
+def _size(obj):
+  '''number of points in a timeseries, rows in an rdb or tablegrid, else None'''
+  if isinstance(obj, (timeseries, rdb, tablegrid)):
+    return len(obj.data)
+  return None
+
+
+def instrumented(f, name):
+  '''Wraps method f so each call records its count, wall and CPU time, the
+     size of self and of the result, and exceptions, including the ones that
+     the method swallows into self.status.  Times are cumulative, they
+     include nested instrumented calls, a swallowed error is only counted
+     for the innermost call on self that recorded it.
+  '''
+
+  @wraps(f)
+  def wrapper(self, *args, **kwargs):
+    #self.status is swapped for a new copy of the same message, any error
+    #the method records replaces the copy, even when the message repeats
+    status = getattr(self, "status", None)
+    stack = _calls.__dict__.setdefault("stack", [])
+    frame = None
+    if isinstance(status, str):
+      mark = status[:1] + status[1:]
+      frame = [self, mark]
+      self.status = mark
+      stack.append(frame)
+    event = {"input": _size(self), "output": None, "error": None}
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+      output = f(self, *args, **kwargs)
+      event["output"] = _size(output)
+      return output
+    except Exception as e:
+      event["error"] = "%s: %s" % (type(e).__name__, str(e))
+      raise
+    finally:
+      event["wall"] = time.perf_counter() - wall
+      event["cpu"] = time.process_time() - cpu
+      if frame != None:
+        stack.pop()
+        after = getattr(self, "status", None)
+        if after is mark:
+          self.status = status
+        elif after is not frame[1] and event["error"] == None and after != "OK":
+          event["error"] = after.strip()
+          event["swallowed"] = True
+          #the enclosing calls on self did not record this error themselves
+          for outer in stack:
+            if outer[0] is self:
+              outer[1] = after
+      m = _metrics.get(name)
+      if m == None:
+        m = _metrics[name] = {
+            "calls": 0, "wall": 0.0, "cpu": 0.0, "input_points": 0,
+            "output_points": 0, "errors": 0, "swallowed": 0, "last_error": None
+        }
+      m["calls"] += 1
+      m["wall"] += event["wall"]
+      m["cpu"] += event["cpu"]
+      m["input_points"] += event["input"] or 0
+      m["output_points"] += event["output"] or 0
+      if event["error"] != None:
+        m["errors"] += 1
+        m["last_error"] = event["error"]
+        if event.get("swallowed"):
+          m["swallowed"] += 1
+      if _metricsHook != None:
+        _metricsHook(name, event)
+
+  return wrapper
+
+
+def enableInstrumentation(hook=None, classes=None):
+  '''Instruments the public methods of timeseries, rdb and tablegrid
+     hook - optional function called as hook(name, event) after every call,
+            event is a dict with input, output, wall, cpu and error
+     classes - optional list of classes to instrument instead
+     Methods are only wrapped while instrumentation is enabled, so there is
+     no overhead when it is off.
+  '''
+  global _metricsHook, _calls
+  import threading
+  _metricsHook = hook
+  if _calls == None:
+    _calls = threading.local()
+  for cls in classes or (timeseries, rdb, tablegrid):
+    for name, f in list(vars(cls).items()):
+      if name.startswith("_") or not callable(f) or (cls, name) in _uninstrumented:
+        continue
+      _uninstrumented[(cls, name)] = f
+      setattr(cls, name, instrumented(f, "%s.%s" % (cls.__name__, name)))
+
+
+def disableInstrumentation():
+  '''Restores the original methods, collected metrics are kept'''
+  global _metricsHook
+  _metricsHook = None
+  for (cls, name), f in _uninstrumented.items():
+    setattr(cls, name, f)
+  _uninstrumented.clear()
+
+
+def instrumentationSnapshot():
+  '''returns a copy of the collected metrics, keyed by "class.method"'''
+  return dict((name, dict(m)) for name, m in _metrics.items())
+
+
+def resetInstrumentation():
+  '''clears the collected metrics'''
+  _metrics.clear()
+
+
+#========================================================================
+# Opt-in result cache
+#========================================================================
+
+
+class resultcache:
+  '''Bounded LRU cache of the results of memoized timeseries methods
+     max_entries - number of results kept
+     max_bytes - estimated size of the results kept
+     The least recently used results are evicted when either is exceeded.
+  '''
+
+  def __init__(self, max_entries=256, max_bytes=64 << 20):
+    from collections import OrderedDict
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.entries = OrderedDict()
+    self.bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def _size(self, value):
+    '''estimated size in bytes of a result'''
+    if isinstance(value, timeseries):
+      #two doubles per point, or a row list, a datetime and a float
+      return 16 * len(value.data) if value.isColumnar() else 150 * len(value.data)
+    if isinstance(value, dict):
+      return sum(self._size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+      return sys.getsizeof(value) + sum(self._size(v) for v in value)
+    return sys.getsizeof(value)
+
+  def get(self, key):
+    '''returns (found, value) and marks the entry as recently used'''
+    entry = self.entries.get(key)
+    if entry == None:
+      self.misses += 1
+      return False, None
+    self.entries.move_to_end(key)
+    self.hits += 1
+    return True, entry[0]
+
+  def put(self, key, value):
+    size = self._size(value)
+    if size > self.max_bytes:
+      return
+    if key in self.entries:
+      self.bytes -= self.entries.pop(key)[1]
+    self.entries[key] = (value, size)
+    self.bytes += size
+    while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+      self.bytes -= self.entries.popitem(last=False)[1][1]
+      self.evictions += 1
+
+  def invalidate(self, ts=None):
+    '''drops the results of timeseries ts, or every result'''
+    if ts == None:
+      self.entries.clear()
+      self.bytes = 0
+      return
+    for key in [key for key in self.entries if key[0] == ts._uid]:
+      self.bytes -= self.entries.pop(key)[1]
+
+  def stats(self):
+    '''returns the hit and miss counts and the current size'''
+    lookups = self.hits + self.misses
+    return {
+        "hits": self.hits,
+        "misses": self.misses,
+        "hit_rate": self.hits / lookups if lookups else None,
+        "evictions": self.evictions,
+        "entries": len(self.entries),
+        "bytes": self.bytes
+    }
+
+
+def enableResultCache(max_entries=256, max_bytes=64 << 20):
+  '''Starts caching the results of memoized timeseries methods such as
+     resample, average, globalMax, trendline and averageWY
+     returns the resultcache, replacing any previous one
+  '''
+  global _resultCache
+  _resultCache = resultcache(max_entries, max_bytes)
+  return _resultCache
+
+
+def disableResultCache():
+  '''Stops caching and drops the cached results'''
+  global _resultCache
+  _resultCache = None